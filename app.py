@@ -1,12 +1,17 @@
 from flask import Flask
 from flask_cors import CORS
 
+from src.database import session as db_session
+from src.utils import query_stats_helper
+
 from src.api.controllers.auth_controller import auth_bp
 from src.api.controllers.user_controller import user_bp
 from src.api.controllers.surat_masuk_controller import surat_masuk_bp
 from src.api.controllers.surat_keluar_controller import surat_keluar_bp
 from src.api.controllers.dashboard_controller import dashboard_bp
 from src.api.controllers.notification_controller import notification_bp
+from src.api.controllers.admin_controller import admin_bp
+from src.api.controllers.file_controller import file_bp
 
 
 def create_app():
@@ -17,10 +22,19 @@ def create_app():
         r"/*": {
             "origins": ["*"],
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"]
+            "allow_headers": ["Content-Type", "Authorization", "X-Last-Write"],
+            # Penanda read-your-writes, dikirim ulang client di request berikutnya
+            "expose_headers": ["X-Last-Write"]
         }
     })
 
+    # Statistik query per request dan header Server-Timing. Didaftarkan sebelum
+    # session agar hook-nya berjalan setelah commit (after_request dijalankan terbalik)
+    query_stats_helper.init_app(app)
+
+    # Satu session database per request, di-commit sekali di akhir request
+    db_session.init_app(app)
+
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(user_bp)
@@ -28,6 +42,8 @@ def create_app():
     app.register_blueprint(surat_keluar_bp)
     app.register_blueprint(dashboard_bp)
     app.register_blueprint(notification_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(file_bp)
     return app
 
 if __name__ == "__main__":
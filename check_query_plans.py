@@ -0,0 +1,123 @@
+# check_query_plans.py
+#
+# Jalankan query-query service terhadap database Postgres, lalu periksa rencana
+# eksekusinya (EXPLAIN). Gagal (exit code 1) jika ada query yang membaca seluruh
+# tabel, yaitu Seq Scan atau scan index tanpa Index Cond yang masih butuh Filter.
+#
+# enable_seqscan dimatikan selama EXPLAIN supaya hasilnya tidak tergantung jumlah
+# data: pada tabel kecil planner selalu memilih Seq Scan walaupun index tersedia.
+
+import sys
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from src.database.config import engine, SessionLocal
+from src.database.models import User, RoleEnum, DivisiEnum
+from src.api.services.surat_masuk_service import surat_masuk_service
+from src.api.services.surat_keluar_service import surat_keluar_service
+from src.api.services.notification_service import notification_service
+from src.api.services.dashboard_service import DashboardService
+from app import create_app
+
+INDEX_SCAN_NODES = ('Index Scan', 'Index Only Scan')
+
+
+def capture_statements(fn, *args, **kwargs):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        fn(*args, **kwargs)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+    return statements
+
+
+def find_full_scans(node, problems):
+    node_type = node.get('Node Type')
+    relation = node.get('Relation Name')
+    if node_type == 'Seq Scan':
+        problems.append(f"Seq Scan pada {relation}")
+    elif node_type in INDEX_SCAN_NODES and 'Filter' in node and 'Index Cond' not in node:
+        problems.append(f"{node_type} tanpa Index Cond pada {relation} (Filter: {node['Filter']})")
+
+    for child in node.get('Plans', []):
+        find_full_scans(child, problems)
+    return problems
+
+
+def explain(statement, parameters):
+    with engine.connect() as conn:
+        conn.exec_driver_sql("SET enable_seqscan = off")
+        plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+        conn.rollback()
+    return plan[0]['Plan']
+
+
+def sample_users():
+    db = SessionLocal()
+    try:
+        sekertaris = db.query(User.id).filter(User.role == RoleEnum.sekertaris).first()
+        anggota = db.query(User.id).filter(User.divisi.isnot(None)).first()
+        return [row.id for row in (sekertaris, anggota) if row]
+    finally:
+        db.close()
+
+
+def checks():
+    divisi = DivisiEnum.teknis_dan_hukum.value
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=30)
+    dashboard_service = DashboardService()
+
+    for label, list_fn in (
+        ('surat_masuk', surat_masuk_service.get_surat_masuk),
+        ('surat_keluar', surat_keluar_service.get_surat_keluar),
+    ):
+        yield f"{label}: list", list_fn
+        yield f"{label}: list divisi", lambda fn=list_fn: fn(divisi=divisi)
+        yield f"{label}: list tanggal", lambda fn=list_fn: fn(start_date=start_date, end_date=end_date)
+        yield f"{label}: list search", lambda fn=list_fn: fn(search='rapat')
+        yield f"{label}: list cursor", lambda fn=list_fn: fn(divisi=divisi, cursor='')
+
+    for user_id in sample_users():
+        yield f"notifikasi user {user_id}", lambda uid=user_id: notification_service.get_unread_notifications(uid)
+
+    yield "dashboard", dashboard_service.get_stats
+    yield "dashboard divisi", lambda: dashboard_service.get_stats(divisi=divisi)
+
+
+def main():
+    if engine.dialect.name != 'postgresql':
+        print("Pemeriksaan rencana query hanya didukung untuk Postgres.")
+        return 1
+
+    # Service memakai session per request, jadi setiap pemeriksaan dijalankan
+    # di dalam application context-nya sendiri
+    app = create_app()
+    failures = 0
+    for label, fn in checks():
+        with app.app_context():
+            statements = capture_statements(fn)
+        for statement, parameters in statements:
+            problems = find_full_scans(explain(statement, parameters), [])
+            if problems:
+                failures += 1
+                print(f"❌ {label}")
+                for problem in problems:
+                    print(f"   - {problem}")
+                print(f"   {' '.join(statement.split())}")
+
+    if failures:
+        print(f"{failures} query membaca seluruh tabel.")
+        return 1
+
+    print("✅ Semua query service memakai index.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
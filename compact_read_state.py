@@ -0,0 +1,26 @@
+# compact_read_state.py
+#
+# Majukan watermark baca setiap user sampai sebelum surat belum dibaca tertuanya
+# dan hapus pengecualian yang sudah tercakup. "Tandai dibaca" hanya memadatkan
+# jika pengecualian user melewati READ_EXCEPTION_COMPACT_THRESHOLD, jadi script
+# ini sebaiknya dijalankan berkala (mis. cron harian).
+
+from src.database.config import SessionLocal
+from src.api.services.read_state_service import read_state_service
+
+
+def compact_read_state():
+    db = SessionLocal()
+    try:
+        processed = read_state_service.compact_all(db)
+        db.commit()
+        print(f"Watermark baca {processed} pasangan user dan tipe surat berhasil dipadatkan.")
+    except Exception as e:
+        print(f"Error compacting read state: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    compact_read_state()
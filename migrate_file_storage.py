@@ -0,0 +1,62 @@
+# migrate_file_storage.py
+#
+# Pindahkan file surat lama (disimpan per nama di src/storage/surat_masuk/ dan
+# src/storage/surat_keluar/) ke storage berbasis hash, sehingga file yang sama
+# hanya disimpan sekali. File lama dihapus setelah suratnya menunjuk ke blob.
+# Aman dijalankan ulang; surat yang sudah punya file_hash dilewati. Surat yang
+# filenya tidak ada di disk dicetak per tabel supaya bisa diupload ulang.
+
+import os
+from werkzeug.datastructures import FileStorage
+from src.database.config import SessionLocal
+from src.database.models import SuratMasuk, SuratKeluar
+from src.utils.file_storage_helper import store_upload, collect_blob
+
+
+def migrate_file_storage():
+    moved = 0
+    missing = {}
+    for model in (SuratMasuk, SuratKeluar):
+        db = SessionLocal()
+        try:
+            surat_ids = [
+                row.id for row in db.query(model.id).filter(model.file_hash.is_(None)).order_by(model.id)
+            ]
+        finally:
+            db.close()
+
+        # Satu transaksi per surat supaya kegagalan satu file tidak membatalkan semuanya
+        for surat_id in surat_ids:
+            db = SessionLocal()
+            sha256 = None
+            try:
+                surat = db.query(model).filter(model.id == surat_id).first()
+                if not surat or surat.file_hash:
+                    continue
+                if not surat.file_path or not os.path.exists(surat.file_path):
+                    missing.setdefault(model.__tablename__, []).append(surat_id)
+                    continue
+
+                old_path = surat.file_path
+                with open(old_path, 'rb') as stream:
+                    sha256, surat.file_path = store_upload(db, FileStorage(stream))
+                surat.file_hash = sha256
+                db.commit()
+                os.remove(old_path)
+                moved += 1
+            except Exception as e:
+                print(f"Error migrating {model.__tablename__} {surat_id}: {e}")
+                db.rollback()
+                # Blob sudah ditulis ke disk tetapi referensinya tidak tersimpan
+                if sha256:
+                    collect_blob(sha256)
+            finally:
+                db.close()
+
+    print(f"{moved} file dipindahkan ke storage berbasis hash.")
+    for table, surat_ids in missing.items():
+        print(f"{len(surat_ids)} file {table} tidak ditemukan, id: {', '.join(map(str, surat_ids))}")
+
+
+if __name__ == "__main__":
+    migrate_file_storage()
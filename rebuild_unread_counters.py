@@ -0,0 +1,28 @@
+# rebuild_unread_counters.py
+#
+# Hitung ulang counter surat belum dibaca untuk semua user (atau satu user lewat
+# argumen user_id), untuk memperbaiki selisih antara counter dan data surat.
+
+import sys
+from src.database.config import SessionLocal
+from src.api.services.notification_service import notification_service
+
+
+def rebuild_unread_counters(user_id=None):
+    db = SessionLocal()
+    try:
+        notification_service.rebuild_unread_counts(db, user_id)
+        db.commit()
+        if user_id is None:
+            print("Counter belum dibaca untuk semua user berhasil dihitung ulang.")
+        else:
+            print(f"Counter belum dibaca untuk user {user_id} berhasil dihitung ulang.")
+    except Exception as e:
+        print(f"Error rebuilding unread counters: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    rebuild_unread_counters(int(sys.argv[1]) if len(sys.argv) > 1 else None)
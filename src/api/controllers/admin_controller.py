@@ -0,0 +1,35 @@
+from flask import Blueprint, jsonify
+from src.database.config import engine, replica_engines
+from src.database.pool import pool_stats
+from src.utils.jwt_helper import admin_required
+
+class AdminController:
+    def __init__(self):
+        self.bp = Blueprint('admin', __name__, url_prefix='/admin')
+        self.setup_routes()
+
+    def setup_routes(self):
+        self.bp.route('/pool-stats', methods=['GET'])(admin_required(self.get_pool_stats))
+
+    def get_pool_stats(self):
+        # Statistik pool koneksi database milik worker yang melayani request ini
+        try:
+            return jsonify({
+                "status": "success",
+                "data": {
+                    "primary": pool_stats(engine.pool),
+                    "replicas": [
+                        {
+                            "url": replica.url.render_as_string(hide_password=True),
+                            **pool_stats(replica.pool)
+                        }
+                        for replica in replica_engines
+                    ]
+                }
+            }), 200
+        except Exception as e:
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+# Create controller instance
+admin_controller = AdminController()
+admin_bp = admin_controller.bp
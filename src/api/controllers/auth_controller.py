@@ -63,8 +63,10 @@ class AuthController:
         if not current_password or not new_password:
             return jsonify({"message": "Current password and new password are required"}), 400
 
-        # Verifikasi password lama
-        user = request.current_user
+        # Verifikasi password lama; hash password tidak disimpan di cache principal
+        user = self.user_service.get_user(request.current_user.id)
+        if not user:
+            return jsonify({"message": "User not found"}), 404
         if not check_password_hash(user.password_hash, current_password):
             return jsonify({"message": "Current password is incorrect"}), 401
 
@@ -1,8 +1,12 @@
+from datetime import date, datetime, timedelta
 from flask import Blueprint, jsonify, request
-from src.api.services.dashboard_service import DashboardService
+from src.api.services.dashboard_service import DashboardService, GRANULARITIES
+from src.database.models import DivisiEnum
 from src.utils.jwt_helper import admin_required, login_required
 
 class DashboardController:
+    MAX_BUCKETS = 1000
+
     def __init__(self):
         self.bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
         self.setup_routes()
@@ -10,6 +14,7 @@ class DashboardController:
 
     def setup_routes(self):
         self.bp.route('/stats/', methods=['GET'])(login_required(self.get_stats))
+        self.bp.route('/timeseries', methods=['GET'])(login_required(self.get_timeseries))
 
     def get_stats(self):
         try:
@@ -24,6 +29,50 @@ class DashboardController:
                 'status': 'error',
                 'message': str(e)
             }), 500 
-    
+
+    def get_timeseries(self):
+        try:
+            granularity = request.args.get('granularity', 'month')
+            if granularity not in GRANULARITIES:
+                raise ValueError(f"granularity harus salah satu dari: {', '.join(GRANULARITIES)}")
+
+            divisi = request.args.get('divisi', None)
+            if divisi and divisi not in [d.value for d in DivisiEnum]:
+                raise ValueError("Divisi tidak valid")
+
+            try:
+                end_date = request.args.get('end_date')
+                end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else date.today()
+                start_date = request.args.get('start_date')
+                start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else end_date - timedelta(days=365)
+            except ValueError:
+                raise ValueError("Format tanggal harus YYYY-MM-DD")
+
+            if start_date > end_date:
+                raise ValueError("start_date tidak boleh setelah end_date")
+            if (end_date - start_date).days > self.MAX_BUCKETS * {'day': 1, 'week': 7, 'month': 31}[granularity]:
+                raise ValueError(f"Rentang tanggal terlalu panjang (maksimal {self.MAX_BUCKETS} bucket)")
+
+            timeseries = self.dashboard_service.get_timeseries(
+                start_date=start_date,
+                end_date=end_date,
+                granularity=granularity,
+                divisi=divisi
+            )
+            return jsonify({
+                'status': 'success',
+                'data': timeseries
+            }), 200
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 400
+        except Exception as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e)
+            }), 500
+
 dashboard_controller = DashboardController()
 dashboard_bp = dashboard_controller.bp
\ No newline at end of file
@@ -0,0 +1,56 @@
+from flask import Blueprint, jsonify
+from src.api.services.surat_masuk_service import SuratMasukService
+from src.api.services.surat_keluar_service import SuratKeluarService
+from src.utils.file_response import send_stored_file
+from src.utils.file_storage_helper import blob_path
+from src.utils.signed_url_helper import verify_file_token
+import time
+
+class FileController:
+    def __init__(self):
+        self.bp = Blueprint('files', __name__, url_prefix='/files')
+        self.setup_routes()
+        self.surat_services = {
+            'surat_masuk': SuratMasukService(),
+            'surat_keluar': SuratKeluarService()
+        }
+
+    def setup_routes(self):
+        # Tanpa login_required: akses dibuktikan oleh token bertanda tangan
+        # (lihat /surat-masuk/<id>/file-url)
+        self.bp.route('/<token>/<path:name>', methods=['GET'])(self.download_file)
+
+    def download_file(self, token, name):
+        try:
+            signed = verify_file_token(token)
+            if signed is None:
+                return jsonify({"status": "error", "message": "URL download tidak valid atau sudah kedaluwarsa"}), 403
+
+            if signed["file_hash"]:
+                # File per hash: lokasinya diketahui dari hash, tanpa query database
+                file_path = blob_path(signed["file_hash"])
+            else:
+                # File lama (sebelum storage berbasis hash) dicari dari data surat
+                service = self.surat_services.get(signed["surat_type"])
+                surat_file = service.get_file_info(signed["surat_id"]) if service else None
+                if not surat_file or not surat_file.file_path:
+                    return jsonify({"status": "error", "message": "File tidak ditemukan"}), 404
+                file_path = surat_file.file_path
+
+            # URL memuat waktu kedaluwarsa, jadi response boleh di-cache proxy sampai saat itu
+            response = send_stored_file(
+                file_path,
+                name,
+                etag=signed["file_hash"],
+                max_age=max(int(signed["expires"] - time.time()), 0),
+                public=True
+            )
+            if response is None:
+                return jsonify({"status": "error", "message": "File tidak ditemukan di server"}), 404
+            return response
+        except Exception as e:
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+# Create controller instance
+file_controller = FileController()
+file_bp = file_controller.bp
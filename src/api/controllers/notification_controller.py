@@ -1,6 +1,11 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from src.api.services.notification_service import NotificationService
+from src.api.services.read_state_service import read_state_service
+from src.database.config import SSE_KEEPALIVE_SECONDS, SSE_MAX_SECONDS
 from src.utils.jwt_helper import login_required
+from datetime import datetime
+import json
+import time
 
 class NotificationController:
     def __init__(self):
@@ -10,26 +15,100 @@ class NotificationController:
 
     def setup_routes(self):
         self.bp.route('/', methods=['GET'])(login_required(self.get_notifications))
+        self.bp.route('/count', methods=['GET'])(login_required(self.get_unread_count))
+        self.bp.route('/stream', methods=['GET'])(login_required(self.stream_notifications))
+        self.bp.route('/read', methods=['POST'])(login_required(self.mark_all_as_read))
 
     def get_notifications(self):
         try:
             user_id = request.current_user.id
-            notifications, error = self.notification_service.get_unread_notifications(user_id)
+            limit = request.args.get('limit', 50, type=int)
+            cursor = request.args.get('cursor', None)
+
+            if limit < 1 or limit > 100:
+                return jsonify({"status": "error", "message": "Limit must be between 1 and 100"}), 400
+
+            result, error = self.notification_service.get_unread_notifications(
+                user_id,
+                limit=limit,
+                cursor=cursor
+            )
 
             if error:
                 return jsonify({"status": "error", "message": error}), 404
 
             return jsonify({
                 "status": "success",
-                "data": {
-                    "notifications": notifications,
-                    "unread_count": len(notifications)
-                }
+                "data": result
             }), 200
 
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
         except Exception as e:
             return jsonify({"status": "error", "message": str(e)}), 500
 
+    def get_unread_count(self):
+        try:
+            counts = self.notification_service.get_unread_count(request.current_user.id)
+            return jsonify({"status": "success", "data": counts}), 200
+        except Exception as e:
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    def mark_all_as_read(self):
+        # Tandai semua notifikasi sampai `before` (default: sekarang) sudah dibaca
+        try:
+            data = request.get_json(silent=True) or {}
+            before = data.get('before')
+            try:
+                before = datetime.fromisoformat(before) if before else datetime.now()
+            except (TypeError, ValueError):
+                return jsonify({"status": "error", "message": "Format before harus YYYY-MM-DD HH:MM:SS"}), 400
+
+            result, error = read_state_service.mark_all_as_read(request.current_user, before)
+            if error:
+                return jsonify({"status": "error", "message": error}), 400
+
+            return jsonify({"status": "success", "data": result}), 200
+        except Exception as e:
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    def stream_notifications(self):
+        # Server-Sent Events: notifikasi surat baru dikirim begitu surat dibuat,
+        # menggantikan polling /notifications/ dan /dashboard/stats/.
+        # Setiap koneksi menahan satu worker selama terbuka, jadi endpoint ini
+        # butuh worker gevent/eventlet (mis. gunicorn -k gevent), bukan worker sync.
+        subscription = self.notification_service.subscribe(request.current_user)
+
+        def generate():
+            deadline = time.monotonic() + SSE_MAX_SECONDS
+            keepalive_at = time.monotonic() + SSE_KEEPALIVE_SECONDS
+            try:
+                yield "retry: 5000\n\n"
+                while True:
+                    now = time.monotonic()
+                    if now >= deadline:
+                        # Client menyambung ulang otomatis setelah `retry`
+                        return
+                    if now >= keepalive_at:
+                        # Komentar berkala agar proxy tidak menutup koneksi yang sepi
+                        yield ": keep-alive\n\n"
+                        keepalive_at = now + SSE_KEEPALIVE_SECONDS
+
+                    event = subscription.get(timeout=max(min(keepalive_at, deadline) - now, 0))
+                    if event is not None:
+                        yield f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            finally:
+                subscription.close()
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/event-stream',
+            headers={
+                'Cache-Control': 'no-cache',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+
 # Create controller instance
 notification_controller = NotificationController()
 notification_bp = notification_controller.bp 
\ No newline at end of file
@@ -1,6 +1,12 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, Response, stream_with_context, url_for
 from src.api.services.surat_keluar_service import SuratKeluarService
 from src.utils.jwt_helper import login_required, admin_required
+from src.utils.count_helper import COUNT_MODES
+from src.utils.serializer_helper import serialize_surat_row, serialize_surat_rows
+from src.utils.export_helper import EXPORT_FORMATS, stream_csv, stream_xlsx, stream_file_archive
+from src.database.session import stream_db
+from src.utils.file_response import send_stored_file
+from src.utils.signed_url_helper import sign_file_token
 from datetime import datetime
 import os
 
@@ -12,12 +18,17 @@ class SuratKeluarController:
 
     def setup_routes(self):
         self.bp.route('/', methods=['GET'])(login_required(self.list_surat))
+        self.bp.route('/export', methods=['GET'])(login_required(self.export_surat))
+        self.bp.route('/files', methods=['GET'])(login_required(self.download_files))
         self.bp.route('/<int:surat_id>', methods=['GET'])(login_required(self.get_surat))
         self.bp.route('/', methods=['POST'])(login_required(self.create_surat))
         self.bp.route('/<int:surat_id>', methods=['PUT'])(login_required(self.update_surat))
         self.bp.route('/<int:surat_id>', methods=['DELETE'])(login_required(self.delete_surat))
         self.bp.route('/<int:surat_id>/file', methods=['GET'])(login_required(self.get_file))
+        self.bp.route('/<int:surat_id>/file-url', methods=['GET'])(login_required(self.get_file_url))
         self.bp.route('/<int:surat_id>/read', methods=['POST'])(login_required(self.mark_as_read))
+        self.bp.route('/<int:surat_id>/readers', methods=['GET'])(login_required(self.list_readers))
+        self.bp.route('/read', methods=['POST'])(login_required(self.mark_many_as_read))
 
     def list_surat(self):
         try:
@@ -28,6 +39,9 @@ class SuratKeluarController:
             start_date = request.args.get('start_date', None)
             end_date = request.args.get('end_date', None)
             divisi = request.args.get('divisi', None)
+            # Mode cursor (keyset) aktif jika parameter `cursor` dikirim, walaupun kosong
+            cursor = request.args.get('cursor', None)
+            count_mode = request.args.get('count', 'exact')
 
             # Convert dates if provided
             if start_date:
@@ -40,6 +54,8 @@ class SuratKeluarController:
                 return jsonify({"status": "error", "message": "Page number must be greater than 0"}), 400
             if per_page < 1 or per_page > 100:
                 return jsonify({"status": "error", "message": "Items per page must be between 1 and 100"}), 400
+            if count_mode not in COUNT_MODES:
+                return jsonify({"status": "error", "message": "Count must be one of: exact, estimate, none"}), 400
 
             # Get surat with pagination and filters
             result = self.surat_keluar_service.get_surat_keluar(
@@ -48,23 +64,14 @@ class SuratKeluarController:
                 search=search,
                 start_date=start_date,
                 end_date=end_date,
-                divisi=divisi
+                divisi=divisi,
+                cursor=cursor,
+                count_mode=count_mode,
+                user_id=request.current_user.id
             )
 
             # Format surat list
-            surat_list = [{
-                "id": s.id,
-                "nomor_surat": s.nomor_surat,
-                "tanggal_surat": s.tanggal_surat.strftime('%Y-%m-%d'),
-                "tanggal_kirim": s.tanggal_kirim.strftime('%Y-%m-%d'),
-                "ditujukan_kepada": s.ditujukan_kepada,
-                "perihal": s.perihal,
-                "keterangan": s.keterangan,
-                "divisi": s.divisi,
-                "inserted_by": s.inserted_by.nama_lengkap if s.inserted_by else None,
-                "inserted_at": s.inserted_at.strftime('%Y-%m-%d %H:%M:%S'),
-                "dibaca_oleh_id": s.dibaca_oleh_id
-            } for s in result["surat_list"]]
+            surat_list = serialize_surat_rows(result["surat_list"])
 
             return jsonify({
                 "status": "success",
@@ -73,30 +80,96 @@ class SuratKeluarController:
                     "pagination": result["pagination"]
                 }
             }), 200
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
         except Exception as e:
             return jsonify({"status": "error", "message": str(e)}), 500
 
+    def export_surat(self):
+        # Export semua surat yang cocok dengan filter list (tanpa paginasi) sebagai CSV/XLSX
+        try:
+            export_format = request.args.get('format', 'csv')
+            search = request.args.get('search', None)
+            start_date = request.args.get('start_date', None)
+            end_date = request.args.get('end_date', None)
+            divisi = request.args.get('divisi', None)
+
+            if export_format not in EXPORT_FORMATS:
+                return jsonify({"status": "error", "message": "Format must be one of: csv, xlsx"}), 400
+            if start_date:
+                start_date = datetime.strptime(start_date, '%Y-%m-%d')
+            if end_date:
+                end_date = datetime.strptime(end_date, '%Y-%m-%d')
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        service = self.surat_keluar_service
+
+        def rows():
+            # Session request sudah ditutup saat body dikirim, jadi baris dibaca
+            # lewat session milik stream ini
+            with stream_db() as db:
+                yield from service.iter_export_rows(
+                    db, search=search, start_date=start_date, end_date=end_date, divisi=divisi
+                )
+
+        filename = f"surat_keluar_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+        if export_format == 'csv':
+            body = (chunk.encode('utf-8') for chunk in stream_csv(service.EXPORT_COLUMNS, rows()))
+            mimetype = 'text/csv; charset=utf-8'
+        else:
+            body = stream_xlsx(service.EXPORT_COLUMNS, rows(), sheet_name='Surat Keluar')
+            mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+
+    def download_files(self):
+        # Semua file surat yang cocok dengan filter list dalam satu arsip ZIP
+        try:
+            search = request.args.get('search', None)
+            start_date = request.args.get('start_date', None)
+            end_date = request.args.get('end_date', None)
+            divisi = request.args.get('divisi', None)
+
+            if start_date:
+                start_date = datetime.strptime(start_date, '%Y-%m-%d')
+            if end_date:
+                end_date = datetime.strptime(end_date, '%Y-%m-%d')
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        service = self.surat_keluar_service
+
+        def body():
+            with stream_db() as db:
+                yield from stream_file_archive(service.iter_file_rows(
+                    db, search=search, start_date=start_date, end_date=end_date, divisi=divisi
+                ))
+
+        filename = f"surat_keluar_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+        return Response(
+            stream_with_context(body()),
+            mimetype='application/zip',
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+
     def get_surat(self, surat_id):
         try:
-            surat = self.surat_keluar_service.get_surat_by_id(surat_id)
+            surat = self.surat_keluar_service.get_surat_detail(surat_id, user_id=request.current_user.id)
             if not surat:
                 return jsonify({"status": "error", "message": "Surat tidak ditemukan"}), 404
 
-            surat_dict = {
-                "id": surat.id,
-                "nomor_surat": surat.nomor_surat,
-                "tanggal_surat": surat.tanggal_surat.strftime('%Y-%m-%d'),
-                "tanggal_kirim": surat.tanggal_kirim.strftime('%Y-%m-%d'),
-                "ditujukan_kepada": surat.ditujukan_kepada,
-                "perihal": surat.perihal,
-                "keterangan": surat.keterangan,
-                "divisi": surat.divisi,
-                "inserted_by": surat.inserted_by.nama_lengkap if surat.inserted_by else None,
-                "inserted_at": surat.inserted_at.strftime('%Y-%m-%d %H:%M:%S'),
-                "dibaca_oleh_id": surat.dibaca_oleh_id
-            }
-
-            return jsonify({"status": "success", "data": surat_dict}), 200
+            return jsonify({"status": "success", "data": serialize_surat_row(surat)}), 200
         except Exception as e:
             return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -186,18 +259,34 @@ class SuratKeluarController:
 
     def get_file(self, surat_id):
         try:
-            surat = self.surat_keluar_service.get_surat_by_id(surat_id)
-            if not surat or not surat.file_path:
+            surat_file = self.surat_keluar_service.get_file_info(surat_id)
+            if not surat_file or not surat_file.file_path:
                 return jsonify({"status": "error", "message": "File tidak ditemukan"}), 404
 
-            if not os.path.exists(surat.file_path):
+            response = send_stored_file(surat_file.file_path, surat_file.file_name, etag=surat_file.file_hash)
+            if response is None:
                 return jsonify({"status": "error", "message": "File tidak ditemukan di server"}), 404
+            return response
+        except Exception as e:
+            return jsonify({"status": "error", "message": str(e)}), 500
 
-            return send_file(
-                surat.file_path,
-                as_attachment=True,
-                download_name=os.path.basename(surat.file_path)
-            )
+    def get_file_url(self, surat_id):
+        # URL download sementara tanpa JWT, mis. untuk PDF viewer yang mengirim banyak request Range
+        try:
+            surat_file = self.surat_keluar_service.get_file_info(surat_id)
+            if not surat_file or not surat_file.file_path:
+                return jsonify({"status": "error", "message": "File tidak ditemukan"}), 404
+
+            token, expires = sign_file_token('surat_keluar', surat_id, surat_file.file_hash)
+            # Nama file di akhir URL hanya untuk nama download, tidak ikut ditandatangani
+            name = surat_file.file_name or os.path.basename(surat_file.file_path)
+            return jsonify({
+                "status": "success",
+                "data": {
+                    "url": url_for('files.download_file', token=token, name=name),
+                    "expires_at": datetime.fromtimestamp(expires).isoformat(sep=' ', timespec='seconds')
+                }
+            }), 200
         except Exception as e:
             return jsonify({"status": "error", "message": str(e)}), 500
 
@@ -205,7 +294,7 @@ class SuratKeluarController:
         try:
             success, error = self.surat_keluar_service.mark_as_read(
                 surat_id=surat_id,
-                user_id=request.current_user.id
+                user=request.current_user
             )
 
             if error:
@@ -215,6 +304,58 @@ class SuratKeluarController:
         except Exception as e:
             return jsonify({"status": "error", "message": str(e)}), 500
 
+    def list_readers(self, surat_id):
+        try:
+            page = request.args.get('page', 1, type=int)
+            per_page = request.args.get('per_page', 10, type=int)
+
+            if page < 1:
+                return jsonify({"status": "error", "message": "Page number must be greater than 0"}), 400
+            if per_page < 1 or per_page > 100:
+                return jsonify({"status": "error", "message": "Items per page must be between 1 and 100"}), 400
+
+            result, error = self.surat_keluar_service.get_readers(surat_id, page=page, per_page=per_page)
+            if error:
+                return jsonify({"status": "error", "message": error}), 404
+
+            return jsonify({
+                "status": "success",
+                "data": {
+                    "readers": [reader._asdict() for reader in result["readers"]],
+                    "pagination": result["pagination"]
+                }
+            }), 200
+        except Exception as e:
+            return jsonify({"status": "error", "message": str(e)}), 500
+
+    def mark_many_as_read(self):
+        # Body: {"ids": [1, 2, 3]} dan/atau {"before": "YYYY-MM-DD HH:MM:SS"}
+        try:
+            data = request.get_json(silent=True) or {}
+            ids = data.get('ids')
+            before = data.get('before')
+
+            if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, int) for i in ids)):
+                return jsonify({"status": "error", "message": "ids harus berupa daftar id surat"}), 400
+            if before is not None:
+                try:
+                    before = datetime.fromisoformat(before)
+                except (TypeError, ValueError):
+                    return jsonify({"status": "error", "message": "Format before harus YYYY-MM-DD HH:MM:SS"}), 400
+
+            updated, error = self.surat_keluar_service.mark_many_as_read(
+                user=request.current_user,
+                ids=ids,
+                before=before
+            )
+
+            if error:
+                return jsonify({"status": "error", "message": error}), 400
+
+            return jsonify({"status": "success", "data": {"updated": updated}}), 200
+        except Exception as e:
+            return jsonify({"status": "error", "message": str(e)}), 500
+
 # Create controller instance
 surat_keluar_controller = SuratKeluarController()
 surat_keluar_bp = surat_keluar_controller.bp 
\ No newline at end of file
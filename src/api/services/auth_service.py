@@ -1,6 +1,6 @@
 from werkzeug.security import generate_password_hash, check_password_hash
 from src.database.models import User
-from src.database.config import SessionLocal
+from src.database.session import get_db
 from src.utils.jwt_helper import create_access_token
 from src.api.services.user_service import UserService
 
@@ -9,14 +9,12 @@ class AuthService:
         self.user_service = UserService()
 
     def login(self, username, password):
-        session = SessionLocal()
+        session = get_db()
         user = session.query(User).filter(User.username == username).first()
         if not user:
-            session.close()
             return None, "User not found"
 
         if not check_password_hash(user.password_hash, password):
-            session.close()
             return None, "Incorrect password"
 
         token = create_access_token({
@@ -25,11 +23,10 @@ class AuthService:
             "role": user.role,
             "divisi": user.divisi
         })
-        session.close()
         return token, None
 
     def register_user(self, nama_lengkap, role, divisi):
-        session = SessionLocal()
+        session = get_db()
         
         try:
             # Validasi nama_lengkap jika sudah ada
@@ -38,7 +35,6 @@ class AuthService:
             ).first()
             
             if existing_user:
-                session.close()
                 return None, f"Nama {nama_lengkap} sudah ada. Silakan gunakan nama lain."
 
             # Validasi untuk role kasub - hanya boleh 1 per divisi
@@ -49,7 +45,6 @@ class AuthService:
                 ).first()
                 
                 if existing_kasub:
-                    session.close()
                     return None, f"Kepala Sub Bagian untuk divisi {self._get_divisi_name(divisi)} sudah ada. Hanya boleh ada 1 Kepala Sub Bagian per divisi."
             
             # Validasi untuk role sekertaris - hanya boleh 1 secara global
@@ -59,21 +54,16 @@ class AuthService:
                 ).first()
                 
                 if existing_sekertaris:
-                    session.close()
                     return None, "Sekertaris sudah ada. Hanya boleh ada 1 Sekertaris dalam sistem."
             
             # Validasi divisi untuk role kasub dan staf
             if role in ['kasub', 'staf'] and not divisi:
-                session.close()
                 return None, f"Divisi harus dipilih untuk role {self._get_role_name(role)}"
             
             # Validasi divisi untuk role sekertaris
             if role == 'sekertaris' and divisi:
-                session.close()
                 return None, "Sekertaris tidak perlu memilih divisi"
             
-            session.close()
-            
             # Jika semua validasi berhasil, buat user
             user, error = self.user_service.create_user(nama_lengkap, role, divisi)
             if error:
@@ -89,7 +79,6 @@ class AuthService:
             }, None
             
         except Exception as e:
-            session.close()
             return None, f"Terjadi kesalahan saat mendaftarkan user: {str(e)}"
 
     def _get_divisi_name(self, divisi):
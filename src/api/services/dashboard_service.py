@@ -1,39 +1,250 @@
-from sqlalchemy import func
-from src.database.config import SessionLocal
-from src.database.models import SuratMasuk, SuratKeluar, User, TemplateSurat
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select, union_all, literal, cast, null, String
+from src.database.config import DASHBOARD_SNAPSHOT_TTL, TIMESERIES_CACHE_TTL
+from src.database.session import get_db, use_primary
+from src.database.models import SuratMasuk, SuratKeluar, User, TemplateSurat, DivisiEnum
+from src.utils.cache_helper import TTLCache
+from src.utils.event_bus import event_bus
+
+# Snapshot jumlah data untuk dashboard. Setiap invalidasi menaikkan versi
+# cache, sehingga snapshot yang sedang dihitung saat ada perubahan data tidak
+# disimpan. TTL membatasi selisih antar worker.
+stats_snapshot = TTLCache(ttl=DASHBOARD_SNAPSHOT_TTL, max_size=1)
+
+
+# Jumlah surat per bucket time-series yang sudah tertutup (sebelum bucket berjalan),
+# dengan key (granularity, awal bucket). Perubahan tanggal_surat disebarkan ke
+# semua worker lewat event bus, karena surat bisa dimasukkan dengan tanggal lampau
+timeseries_cache = TTLCache(ttl=TIMESERIES_CACHE_TTL, max_size=50000)
+
+GRANULARITIES = ('day', 'week', 'month')
+DIRECTIONS = ('surat_masuk', 'surat_keluar')
+PANDAS_FREQUENCIES = {'day': 'D', 'week': 'W-MON', 'month': 'MS'}
+
+
+def invalidate_dashboard_stats():
+    """
+    Dipanggil setelah surat atau user dibuat, diubah, atau dihapus.
+    """
+    stats_snapshot.clear()
+
+
+def bucket_start(value, granularity):
+    """
+    Awal bucket yang memuat tanggal `value`, sama seperti date_trunc Postgres
+    (minggu dimulai hari Senin).
+    """
+    if isinstance(value, datetime):
+        value = value.date()
+    if granularity == 'week':
+        return value - timedelta(days=value.weekday())
+    if granularity == 'month':
+        return value.replace(day=1)
+    return value
+
+
+def next_bucket(start, granularity):
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+TIMESERIES_INVALIDATED = 'timeseries_invalidated'
+
+
+def _invalidate_buckets(values):
+    for value in values:
+        for granularity in GRANULARITIES:
+            timeseries_cache.invalidate((granularity, bucket_start(value, granularity)))
+
+
+def _on_event(event):
+    if event.get('type') == TIMESERIES_INVALIDATED:
+        _invalidate_buckets(date.fromisoformat(value) for value in event['dates'])
+
+
+def invalidate_timeseries(*values):
+    """
+    Hapus bucket cache yang memuat tanggal_surat yang berubah, di proses ini
+    dan (lewat event bus) di worker lain. Dipanggil setelah commit.
+    """
+    values = [bucket_start(value, 'day') for value in values if value is not None]
+    if not values:
+        return
+    _invalidate_buckets(values)
+    event_bus.publish({
+        "type": TIMESERIES_INVALIDATED,
+        "dates": sorted({value.isoformat() for value in values})
+    })
+
 
 class DashboardService:
     def __init__(self):
         pass
 
+    def _load_snapshot(self):
+        """
+        Hitung semua jumlah dalam satu query: jumlah surat masuk/keluar per
+        divisi, jumlah user, dan jumlah template surat.
+
+        Returns:
+            dict: {sumber: {divisi: jumlah}}; divisi None untuk sumber tanpa divisi
+        """
+        counts = union_all(
+            select(literal('surat_masuk').label('source'), cast(SuratMasuk.divisi, String).label('divisi'), func.count().label('total'))
+            .group_by(SuratMasuk.divisi),
+            select(literal('surat_keluar'), cast(SuratKeluar.divisi, String), func.count())
+            .group_by(SuratKeluar.divisi),
+            select(literal('users'), cast(null(), String), func.count()).select_from(User),
+            select(literal('template_surat'), cast(null(), String), func.count()).select_from(TemplateSurat)
+        )
+
+        db = get_db()
+        snapshot = {'surat_masuk': {}, 'surat_keluar': {}, 'users': {}, 'template_surat': {}}
+        for source, divisi, total in db.execute(counts):
+            snapshot[source][divisi] = total
+        return snapshot
+
+    def get_snapshot(self):
+        snapshot = stats_snapshot.get('stats')
+        if snapshot is None:
+            generation = stats_snapshot.generation
+            # Snapshot dipakai bersama selama TTL, jangan diambil dari replica yang tertinggal
+            use_primary()
+            snapshot = self._load_snapshot()
+            stats_snapshot.set('stats', snapshot, generation=generation)
+        return snapshot
+
     def get_stats(self, divisi=None):
-        db = SessionLocal()
-
-        try:
-            if divisi:
-                # Get total surat masuk
-                total_surat_masuk = db.query(SuratMasuk).filter(SuratMasuk.divisi == divisi).count()
-                # Get total surat keluar
-                total_surat_keluar = db.query(SuratKeluar).filter(SuratKeluar.divisi == divisi).count()
+        snapshot = self.get_snapshot()
+
+        if divisi:
+            # Get total surat masuk dan surat keluar untuk divisi
+            total_surat_masuk = snapshot['surat_masuk'].get(divisi, 0)
+            total_surat_keluar = snapshot['surat_keluar'].get(divisi, 0)
+        else:
+            # Get total surat masuk dan surat keluar semua divisi
+            total_surat_masuk = sum(snapshot['surat_masuk'].values())
+            total_surat_keluar = sum(snapshot['surat_keluar'].values())
+
+        return {
+            'total_surat_masuk': total_surat_masuk,
+            'total_surat_keluar': total_surat_keluar,
+            'total_anggota': sum(snapshot['users'].values()),
+            'total_template': sum(snapshot['template_surat'].values())
+        }
+
+    def _load_bucket_counts(self, granularity, start, end):
+        """
+        Jumlah surat per (bucket, arah, divisi) untuk tanggal_surat di [start, end),
+        dihitung dengan date_trunc dan GROUP BY dalam satu query.
+        """
+        queries = []
+        for direction, model in (('surat_masuk', SuratMasuk), ('surat_keluar', SuratKeluar)):
+            bucket = func.date_trunc(granularity, model.tanggal_surat)
+            queries.append(
+                select(
+                    bucket.label('bucket'),
+                    literal(direction).label('direction'),
+                    cast(model.divisi, String).label('divisi'),
+                    func.count().label('total')
+                )
+                .where(model.tanggal_surat >= start, model.tanggal_surat < end)
+                .group_by(bucket, model.divisi)
+            )
+
+        db = get_db()
+        return [
+            (row.bucket.date(), row.direction, row.divisi, row.total)
+            for row in db.execute(union_all(*queries))
+        ]
+
+    def get_timeseries(self, start_date, end_date, granularity='month', divisi=None):
+        """
+        Jumlah surat masuk/keluar per bucket waktu (berdasarkan tanggal_surat)
+        dan per divisi. Bucket selalu satu periode penuh: bucket pertama dimulai
+        dari awal bucket yang memuat start_date dan bucket terakhir berakhir di
+        akhir bucket yang memuat end_date. start_date dan end_date di response
+        adalah rentang yang benar-benar dihitung.
+
+        Bucket yang sudah tertutup diambil dari cache; hanya bucket yang belum
+        ada di cache dan bucket yang sedang berjalan yang dihitung di database.
+        """
+        buckets = [
+            ts.date() for ts in pd.date_range(
+                bucket_start(start_date, granularity),
+                end_date,
+                freq=PANDAS_FREQUENCIES[granularity]
+            )
+        ]
+        current = bucket_start(date.today(), granularity)
+        # Mulai menerima invalidasi dari worker lain sebelum bucket pertama di-cache
+        event_bus.add_listener(_on_event)
+
+        records = []
+        pending = []
+        for start in buckets:
+            cached = timeseries_cache.get((granularity, start)) if start < current else None
+            if cached is None:
+                pending.append(start)
             else:
-                # Get total surat masuk
-                total_surat_masuk = db.query(SuratMasuk).count()
-                # Get total surat keluar
-                total_surat_keluar = db.query(SuratKeluar).count()
+                records.extend((start, direction, div, total) for (direction, div), total in cached.items())
+
+        if pending:
+            generation = timeseries_cache.generation
+            if pending[0] < current:
+                # Bucket tertutup disimpan lama di cache, jangan diambil dari replica yang tertinggal
+                use_primary()
+            query_end = next_bucket(pending[-1], granularity)
+            loaded = self._load_bucket_counts(granularity, pending[0], query_end)
 
+            pending_set = set(pending)
+            fresh = {start: {} for start in pending if start < current}
+            for start, direction, div, total in loaded:
+                if start not in pending_set:
+                    continue
+                records.append((start, direction, div, total))
+                if start in fresh:
+                    fresh[start][(direction, div)] = total
 
-            # Get total anggota (users)
-            total_anggota = db.query(User).count()
+            for start, counts in fresh.items():
+                timeseries_cache.set((granularity, start), counts, generation=generation)
 
-            # Get total template surat
-            total_template = db.query(TemplateSurat).count()
+        divisi_list = [divisi] if divisi else [d.value for d in DivisiEnum]
+        columns = pd.MultiIndex.from_product([DIRECTIONS, divisi_list], names=['direction', 'divisi'])
 
-            return {
-                'total_surat_masuk': total_surat_masuk,
-                'total_surat_keluar': total_surat_keluar,
-                'total_anggota': total_anggota,
-                'total_template': total_template
+        frame = pd.DataFrame.from_records(records, columns=['bucket', 'direction', 'divisi', 'total'])
+        if frame.empty:
+            table = pd.DataFrame(0, index=buckets, columns=columns)
+        else:
+            table = frame.pivot_table(
+                index='bucket', columns=['direction', 'divisi'], values='total', aggfunc='sum', fill_value=0
+            ).reindex(index=buckets, columns=columns, fill_value=0)
+
+        values = table.to_numpy(dtype=np.int64)
+        series = [
+            {
+                "direction": direction,
+                "divisi": div,
+                "counts": values[:, i].tolist(),
+                "total": int(values[:, i].sum())
             }
-        finally:
-            db.close()
-        
\ No newline at end of file
+            for i, (direction, div) in enumerate(columns)
+        ]
+        totals = {
+            direction: values[:, columns.get_locs([direction])].sum(axis=1).tolist()
+            for direction in DIRECTIONS
+        }
+
+        return {
+            "granularity": granularity,
+            "start_date": buckets[0].isoformat() if buckets else None,
+            "end_date": (next_bucket(buckets[-1], granularity) - timedelta(days=1)).isoformat() if buckets else end_date.isoformat(),
+            "buckets": [start.isoformat() for start in buckets],
+            "series": series,
+            "totals": totals
+        }
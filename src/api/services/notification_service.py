@@ -1,69 +1,282 @@
-from src.database.config import SessionLocal
-from src.database.models import User, SuratMasuk, SuratKeluar
-from sqlalchemy.orm import joinedload
-from sqlalchemy import or_
+from datetime import datetime
+from functools import partial
+from src.database.session import get_db, on_commit
+from src.database.models import SuratMasuk, SuratKeluar, User, RoleEnum, UnreadCounter
+from src.utils.jwt_helper import load_principal
+from src.utils.pagination_helper import encode_token, decode_token
+from src.utils.event_bus import event_bus
+from src.utils.read_state_helper import unread_condition, is_read
+from sqlalchemy import select, insert, update, delete, union_all, literal, func, case, or_, tuple_
+from sqlalchemy.exc import IntegrityError
+
+# Urutan tipe mengikuti urutan string, dipakai sebagai pemecah nilai inserted_at yang sama
+NOTIFICATION_SOURCES = (
+    ('surat_masuk', SuratMasuk, SuratMasuk.pengirim),
+    ('surat_keluar', SuratKeluar, SuratKeluar.ditujukan_kepada),
+)
+NOTIFICATION_TYPES = tuple(surat_type for surat_type, _, _ in NOTIFICATION_SOURCES)
 
 class NotificationService:
-    def get_unread_notifications(self, user_id):
-        db = SessionLocal()
+    def build_notification(self, surat_type, surat_id, pihak, perihal, inserted_at, divisi):
+        if surat_type == 'surat_masuk':
+            notification_id = f"sm-{surat_id}"
+            title = "Surat Masuk Baru"
+            message = f"Surat dari {pihak} perihal '{perihal}' telah diterima."
+        else:
+            notification_id = f"sk-{surat_id}"
+            title = "Surat Keluar Baru"
+            message = f"Surat untuk {pihak} perihal '{perihal}' telah dibuat."
+
+        return {
+            "id": notification_id,
+            "type": surat_type,
+            "surat_id": surat_id,
+            "title": title,
+            "message": message,
+            "date": inserted_at.strftime('%Y-%m-%d %H:%M:%S'),
+            "is_read": False,
+            "divisi": getattr(divisi, 'value', divisi)
+        }
+
+    def publish_surat_created(self, surat_type, surat):
+        """
+        Kirim notifikasi surat baru ke stream realtime setelah transaksi request
+        di-commit. Surat harus sudah di-flush supaya id-nya tersedia.
+        """
+        pihak = surat.pengirim if surat_type == 'surat_masuk' else surat.ditujukan_kepada
+        notification = self.build_notification(
+            surat_type, surat.id, pihak, surat.perihal, surat.inserted_at, surat.divisi
+        )
+        on_commit(partial(event_bus.publish, notification))
+
+    def subscribe(self, user):
+        """
+        Langganan notifikasi surat baru yang relevan untuk user: surat di
+        divisinya, atau semua surat untuk sekertaris.
+        """
+        if user.role == 'sekertaris':
+            # Event lain di bus yang sama (mis. invalidasi cache) tidak dikirim ke client
+            return event_bus.subscribe(lambda event: event.get('type') in NOTIFICATION_TYPES)
+        divisi = getattr(user.divisi, 'value', user.divisi)
+        return event_bus.subscribe(lambda event: event.get('divisi') == divisi)
+
+    def _unread_filters(self, surat_type, model, user):
+        filters = [unread_condition(model, surat_type, user.id)]
+        # Filter berdasarkan divisi user (sekertaris bisa melihat semua)
+        if user.role != 'sekertaris':
+            filters.append(model.divisi == user.divisi)
+        return filters
+
+    def _after_cursor(self, surat_type, model, position):
+        """
+        Kondisi keyset (inserted_at, type, id) < posisi cursor untuk satu sumber.
+        Karena tipe konstan per sumber, kondisi disederhanakan agar tetap memakai
+        index (divisi, inserted_at) / (inserted_at).
+        """
+        inserted_at, cursor_type, cursor_id = position
+        if surat_type < cursor_type:
+            return model.inserted_at <= inserted_at
+        if surat_type > cursor_type:
+            return model.inserted_at < inserted_at
+        return tuple_(model.inserted_at, model.id) < tuple_(inserted_at, cursor_id)
+
+    def _decode_cursor(self, cursor):
+        if not cursor:
+            return None
         try:
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user:
-                return [], "User not found"
-
-            notifications = []
-            
-            # 1. Ambil Surat Masuk yang belum dibaca
-            surat_masuk_query = db.query(SuratMasuk).options(
-                joinedload(SuratMasuk.inserted_by)
+            inserted_at, surat_type, surat_id = decode_token(cursor)
+            if surat_type not in NOTIFICATION_TYPES or not isinstance(surat_id, int):
+                raise ValueError
+            return datetime.fromisoformat(inserted_at), surat_type, surat_id
+        except (ValueError, TypeError):
+            raise ValueError("Cursor tidak valid")
+
+    def _audience(self, divisi):
+        # User yang menerima notifikasi surat di divisi ini
+        return select(User.id).where(or_(User.role == RoleEnum.sekertaris, User.divisi == divisi))
+
+    def _adjust_unread(self, db, surat_type, user_filter, delta):
+        filters = [UnreadCounter.surat_type == surat_type, user_filter]
+        new_count = UnreadCounter.unread_count + delta
+        if delta < 0:
+            filters.append(UnreadCounter.unread_count > 0)
+            new_count = case((new_count < 0, 0), else_=new_count)
+        db.execute(
+            update(UnreadCounter)
+            .where(*filters)
+            .values(unread_count=new_count)
+            .execution_options(synchronize_session=False)
+        )
+
+    def _unread_by(self, surat_type, divisi, surat):
+        # Counter user di divisi surat (dan sekertaris) yang belum membaca `surat`;
+        # surat baru (belum punya id) belum dibaca siapa pun
+        user_filter = UnreadCounter.user_id.in_(self._audience(divisi))
+        if surat is not None and surat.id is not None:
+            user_filter = user_filter & ~is_read(surat_type, UnreadCounter.user_id, surat.id, surat.inserted_at)
+        return user_filter
+
+    def record_surat_added(self, db, surat_type, divisi, surat=None):
+        """
+        Naikkan counter user di divisi surat (dan sekertaris) yang belum membacanya.
+        Dipanggil di dalam transaksi yang sama dengan pembuatan/perpindahan surat.
+        """
+        self._adjust_unread(db, surat_type, self._unread_by(surat_type, divisi, surat), 1)
+
+    def record_surat_removed(self, db, surat_type, divisi, surat=None):
+        """
+        Turunkan counter user yang belum membaca surat yang dihapus/dipindah divisi.
+        """
+        self._adjust_unread(db, surat_type, self._unread_by(surat_type, divisi, surat), -1)
+
+    def record_surat_read(self, db, surat_type, user_id, count=1):
+        """
+        Turunkan counter user setelah `count` surat baru ditandai dibaca.
+        """
+        if count:
+            self._adjust_unread(db, surat_type, UnreadCounter.user_id == user_id, -count)
+
+    def reset_unread_counts(self, db, user_id):
+        """
+        Hapus counter user (mis. setelah role/divisi berubah); counter akan
+        dihitung ulang saat dibutuhkan.
+        """
+        db.execute(delete(UnreadCounter).where(UnreadCounter.user_id == user_id))
+
+    def rebuild_unread_counts(self, db, user_id=None):
+        """
+        Hitung ulang counter dari data surat, untuk satu user atau semua user.
+        """
+        for surat_type, model, _ in NOTIFICATION_SOURCES:
+            unread = select(func.count(model.id)).where(
+                unread_condition(model, surat_type, User.id),
+                or_(User.role == RoleEnum.sekertaris, model.divisi == User.divisi)
+            ).scalar_subquery()
+            rows = select(User.id, literal(surat_type), unread)
+
+            stale = delete(UnreadCounter).where(UnreadCounter.surat_type == surat_type)
+            if user_id is not None:
+                rows = rows.where(User.id == user_id)
+                stale = stale.where(UnreadCounter.user_id == user_id)
+
+            db.execute(stale)
+            db.execute(
+                insert(UnreadCounter).from_select(
+                    ['user_id', 'surat_type', 'unread_count'], rows
+                )
             )
-            # Filter berdasarkan divisi user (sekertaris bisa melihat semua)
-            if user.role != 'sekertaris':
-                surat_masuk_query = surat_masuk_query.filter(SuratMasuk.divisi == user.divisi)
-            all_surat_masuk = surat_masuk_query.order_by(SuratMasuk.inserted_at.desc()).all()
-
-            for surat in all_surat_masuk:
-                if surat.dibaca_oleh_id is None or user.id not in surat.dibaca_oleh_id:
-                    notifications.append({
-                        "id": f"sm-{surat.id}",
-                        "type": "surat_masuk",
-                        "surat_id": surat.id,
-                        "title": "Surat Masuk Baru",
-                        "message": f"Surat dari {surat.pengirim} perihal '{surat.perihal}' telah diterima.",
-                        "date": surat.inserted_at.strftime('%Y-%m-%d %H:%M:%S'),
-                        "is_read": False,
-                        "divisi": surat.divisi
-                    })
-            
-            # 2. Ambil Surat Keluar yang belum dibaca
-            surat_keluar_query = db.query(SuratKeluar).options(
-                joinedload(SuratKeluar.inserted_by)
+
+    def get_unread_counts(self, db, user_id):
+        """
+        Jumlah surat belum dibaca per tipe, dibaca langsung dari counter.
+
+        Returns:
+            dict: {surat_type: jumlah}
+        """
+        def read_counts():
+            return dict(
+                db.query(UnreadCounter.surat_type, UnreadCounter.unread_count)
+                .filter(UnreadCounter.user_id == user_id)
+                .all()
             )
-            # Filter berdasarkan divisi user (sekertaris bisa melihat semua)
-            if user.role != 'sekertaris':
-                surat_keluar_query = surat_keluar_query.filter(SuratKeluar.divisi == user.divisi)
-            all_surat_keluar = surat_keluar_query.order_by(SuratKeluar.inserted_at.desc()).all()
-
-            for surat in all_surat_keluar:
-                if surat.dibaca_oleh_id is None or user.id not in surat.dibaca_oleh_id:
-                    notifications.append({
-                        "id": f"sk-{surat.id}",
-                        "type": "surat_keluar",
-                        "surat_id": surat.id,
-                        "title": "Surat Keluar Baru",
-                        "message": f"Surat untuk {surat.ditujukan_kepada} perihal '{surat.perihal}' telah dibuat.",
-                        "date": surat.inserted_at.strftime('%Y-%m-%d %H:%M:%S'),
-                        "is_read": False,
-                        "divisi": surat.divisi
-                    })
-
-            # Urutkan semua notifikasi berdasarkan tanggal, dari yang terbaru
-            notifications.sort(key=lambda x: x['date'], reverse=True)
-
-            return notifications, None
-
-        finally:
-            db.close()
+
+        counts = read_counts()
+        if len(counts) < len(NOTIFICATION_TYPES):
+            # Counter belum ada untuk user ini, hitung sekali dari data surat
+            try:
+                with db.begin_nested():
+                    self.rebuild_unread_counts(db, user_id)
+            except IntegrityError:
+                # Request lain sudah membuatnya lebih dulu
+                pass
+            counts = read_counts()
+
+        return {surat_type: max(counts.get(surat_type, 0), 0) for surat_type in NOTIFICATION_TYPES}
+
+    def get_unread_count(self, user_id):
+        counts = self.get_unread_counts(get_db(), user_id)
+        return {
+            "unread_count": sum(counts.values()),
+            **counts
+        }
+
+    def get_unread_notifications(self, user_id, limit=50, cursor=None):
+        """
+        Ambil notifikasi surat yang belum dibaca user, terbaru lebih dulu.
+
+        Filter "belum dibaca" dan penggabungan surat masuk/keluar dilakukan di
+        database, sehingga biayanya mengikuti jumlah notifikasi yang diambil,
+        bukan jumlah seluruh arsip.
+
+        Args:
+            user_id (int): ID user
+            limit (int): Jumlah notifikasi per halaman
+            cursor (str, optional): next_cursor dari halaman sebelumnya
+
+        Returns:
+            tuple: (result, error_message)
+
+        Raises:
+            ValueError: Jika cursor tidak valid
+        """
+        position = self._decode_cursor(cursor)
+
+        user = load_principal(user_id)
+        if not user:
+            return None, "User not found"
+
+        db = get_db()
+        # 1. Ambil Surat Masuk dan Surat Keluar yang belum dibaca, masing-masing
+        #    dibatasi limit + 1 supaya tiap cabang cukup membaca index
+        branches = []
+        for surat_type, model, pihak in NOTIFICATION_SOURCES:
+            filters = self._unread_filters(surat_type, model, user)
+            if position:
+                filters.append(self._after_cursor(surat_type, model, position))
+
+            branch = select(
+                literal(surat_type).label('type'),
+                model.id.label('surat_id'),
+                model.inserted_at,
+                pihak.label('pihak'),
+                model.perihal,
+                model.divisi
+            ).where(*filters)\
+                .order_by(model.inserted_at.desc(), model.id.desc())\
+                .limit(limit + 1)\
+                .subquery()
+            branches.append(select(branch))
+
+        # 2. Gabungkan kedua sumber, urutkan dari yang terbaru
+        merged = union_all(*branches).subquery()
+        rows = db.execute(
+            select(merged)
+            .order_by(merged.c.inserted_at.desc(), merged.c.type.desc(), merged.c.surat_id.desc())
+            .limit(limit + 1)
+        ).all()
+
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+
+        notifications = [
+            self.build_notification(row.type, row.surat_id, row.pihak, row.perihal, row.inserted_at, row.divisi)
+            for row in rows
+        ]
+
+        next_cursor = None
+        if has_next and rows:
+            last = rows[-1]
+            next_cursor = encode_token([last.inserted_at.isoformat(), last.type, last.surat_id])
+
+        return {
+            "notifications": notifications,
+            "unread_count": sum(self.get_unread_counts(db, user.id).values()),
+            "pagination": {
+                "limit": limit,
+                "next_cursor": next_cursor,
+                "has_next": has_next
+            }
+        }, None
 
 # Create a singleton instance
-notification_service = NotificationService() 
\ No newline at end of file
+notification_service = NotificationService()
@@ -0,0 +1,282 @@
+from datetime import datetime
+from functools import partial
+from sqlalchemy import delete, select, exists, literal, func
+from sqlalchemy.dialects.postgresql import insert
+from src.database.session import get_db, on_commit
+from src.database.config import READ_RECEIPT_FLUSH_MS, READ_EXCEPTION_COMPACT_THRESHOLD
+from src.database.models import User, ReadWatermark, ReadException
+from src.api.services.notification_service import notification_service, NOTIFICATION_SOURCES
+from src.utils.read_state_helper import unread_condition, watermark_of, read_count
+from src.utils.read_receipt_buffer import read_receipt_buffer, write_receipts
+
+SURAT_MODELS = {surat_type: model for surat_type, model, _ in NOTIFICATION_SOURCES}
+
+class ReadStateService:
+    """
+    Status baca surat per user disimpan sebagai watermark per tipe surat
+    ("semua yang inserted_at <= T sudah dibaca") ditambah pengecualian untuk
+    surat di atas watermark yang sudah dibaca. dibaca_oleh_id tetap dipakai
+    sebagai daftar siapa saja yang membuka surat (read receipt).
+    """
+    MAX_BULK_IDS = 1000
+
+    def _visible_filters(self, model, user):
+        # Surat yang ikut dihitung di counter belum dibaca user
+        if user.role == 'sekertaris':
+            return []
+        return [model.divisi == user.divisi]
+
+    def _record_receipts(self, db, surat_type, user, surat_ids):
+        """
+        Catat read receipt (dibaca_oleh_id). Baris surat bisa dibuka banyak user
+        bersamaan, jadi receipt dititipkan ke buffer write-behind setelah commit
+        dan ditulis berkelompok; dengan READ_RECEIPT_FLUSH_MS=0 ditulis langsung.
+        """
+        if not READ_RECEIPT_FLUSH_MS:
+            write_receipts(db, surat_type, [(surat_id, user.id) for surat_id in surat_ids])
+            return
+        for surat_id in surat_ids:
+            on_commit(partial(read_receipt_buffer.add, surat_type, surat_id, user.id))
+
+    def _mark_read(self, db, surat_type, user, filters):
+        """
+        Catat pengecualian untuk surat yang cocok dengan `filters` dan belum
+        dibaca, lalu turunkan counter sebanyak surat yang terlihat oleh user.
+
+        Returns:
+            tuple: (id surat terlihat yang baru dibaca, inserted_at terbaru
+            di antaranya, jumlah pengecualian user sebelum statement ini)
+        """
+        model = SURAT_MODELS[surat_type]
+        inserted = insert(ReadException).from_select(
+            ['user_id', 'surat_type', 'surat_id'],
+            select(literal(user.id), literal(surat_type), model.id)
+            .where(*filters, unread_condition(model, surat_type, user.id))
+        ).on_conflict_do_nothing().returning(ReadException.surat_id).cte('inserted')
+
+        # Jumlah pengecualian dihitung di statement yang sama untuk memutuskan pemadatan
+        exception_count = select(func.count()).select_from(ReadException).where(
+            ReadException.user_id == user.id, ReadException.surat_type == surat_type
+        ).scalar_subquery()
+
+        read_ids, newest, exceptions = db.execute(
+            select(func.array_agg(inserted.c.surat_id), func.max(model.inserted_at), exception_count)
+            .select_from(inserted)
+            .join(model, model.id == inserted.c.surat_id)
+            .where(*self._visible_filters(model, user))
+        ).one()
+
+        read_ids = read_ids or []
+        notification_service.record_surat_read(db, surat_type, user.id, len(read_ids))
+        return read_ids, newest, exceptions
+
+    def _maybe_compact(self, db, surat_type, user, newly_read, newest, exceptions):
+        # Pemadatan butuh beberapa query, jadi tidak dijalankan di setiap "tandai dibaca"
+        if newly_read and exceptions + newly_read >= READ_EXCEPTION_COMPACT_THRESHOLD:
+            self._compact(db, surat_type, user, newest)
+
+    def _set_watermark(self, db, surat_type, user_id, read_through):
+        """
+        Majukan watermark (tidak pernah mundur) dan hapus pengecualian yang
+        sudah tercakup olehnya.
+        """
+        model = SURAT_MODELS[surat_type]
+        statement = insert(ReadWatermark).values(
+            user_id=user_id, surat_type=surat_type, read_through=read_through
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[ReadWatermark.user_id, ReadWatermark.surat_type],
+            set_={'read_through': func.greatest(ReadWatermark.read_through, statement.excluded.read_through)}
+        ))
+        db.execute(
+            delete(ReadException)
+            .where(
+                ReadException.user_id == user_id,
+                ReadException.surat_type == surat_type,
+                exists().where(model.id == ReadException.surat_id, model.inserted_at <= read_through)
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def _compact(self, db, surat_type, user, newest=None):
+        """
+        Majukan watermark sampai tepat sebelum surat belum dibaca tertua,
+        sehingga pengecualian di bawahnya bisa dihapus. Dengan `newest`, tidak
+        ada yang dilakukan jika masih ada surat belum dibaca sebelum `newest`.
+        """
+        model = SURAT_MODELS[surat_type]
+        visible = self._visible_filters(model, user)
+        unread = unread_condition(model, surat_type, user.id)
+
+        if newest is not None and db.scalar(select(exists().where(*visible, unread, model.inserted_at < newest))):
+            return
+
+        first_unread = db.scalar(select(func.min(model.inserted_at)).where(*visible, unread))
+        read_through = select(func.max(model.inserted_at)).where(
+            *visible, model.inserted_at > watermark_of(surat_type, user.id)
+        )
+        if first_unread is not None:
+            read_through = read_through.where(model.inserted_at < first_unread)
+
+        read_through = db.scalar(read_through)
+        if read_through is not None:
+            self._set_watermark(db, surat_type, user.id, read_through)
+
+    def mark_as_read(self, surat_type, surat_id, user):
+        """
+        Tandai satu surat sudah dibaca user.
+
+        Returns:
+            tuple: (success, error_message)
+        """
+        model = SURAT_MODELS[surat_type]
+        db = get_db()
+        try:
+            read_ids, newest, exceptions = self._mark_read(db, surat_type, user, [model.id == surat_id])
+            newly_read = len(read_ids)
+
+            # Tidak ada yang berubah: surat tidak ada, atau memang sudah dibaca
+            if not newly_read and db.scalar(select(model.id).where(model.id == surat_id)) is None:
+                return False, "Surat tidak ditemukan"
+
+            self._record_receipts(db, surat_type, user, [surat_id])
+            self._maybe_compact(db, surat_type, user, newly_read, newest, exceptions)
+            return True, None
+        except Exception as e:
+            db.rollback()
+            return False, str(e)
+
+    def mark_many_as_read(self, surat_type, user, ids=None, before=None):
+        """
+        Tandai banyak surat sekaligus: daftar `ids` (dengan read receipt), dan/atau
+        semua surat sampai `before` dengan memajukan watermark.
+
+        Returns:
+            tuple: (jumlah surat terlihat yang baru ditandai, error_message)
+        """
+        if ids is None and before is None:
+            return None, "ids atau before harus diisi"
+        if ids is not None and len(ids) > self.MAX_BULK_IDS:
+            return None, f"Maksimal {self.MAX_BULK_IDS} id per request"
+        if before is not None:
+            # inserted_at disimpan tanpa zona waktu (waktu lokal server)
+            if before.tzinfo is not None:
+                return None, "before tidak boleh memakai zona waktu"
+            # Watermark di masa depan akan membuat surat yang belum dibuat ikut dianggap dibaca
+            before = min(before, datetime.now())
+
+        model = SURAT_MODELS[surat_type]
+        db = get_db()
+        try:
+            updated = 0
+            if ids:
+                # Receipt hanya untuk surat yang benar-benar ada, terlihat oleh user, dan baru dibaca
+                read_ids, newest, exceptions = self._mark_read(db, surat_type, user, [model.id.in_(ids)])
+                self._record_receipts(db, surat_type, user, read_ids)
+                updated = len(read_ids)
+                self._maybe_compact(db, surat_type, user, updated, newest, exceptions)
+
+            if before is not None:
+                newly_read = db.scalar(
+                    select(func.count(model.id)).where(
+                        *self._visible_filters(model, user),
+                        unread_condition(model, surat_type, user.id),
+                        model.inserted_at <= before
+                    )
+                )
+                self._set_watermark(db, surat_type, user.id, before)
+                notification_service.record_surat_read(db, surat_type, user.id, newly_read)
+                updated += newly_read
+
+            return updated, None
+        except Exception as e:
+            db.rollback()
+            return None, str(e)
+
+    def mark_all_as_read(self, user, before):
+        """
+        Tandai semua notifikasi (surat masuk dan keluar) sampai `before` sudah dibaca.
+
+        Returns:
+            tuple: ({surat_type: jumlah}, error_message)
+        """
+        result = {}
+        for surat_type in SURAT_MODELS:
+            updated, error = self.mark_many_as_read(surat_type, user, before=before)
+            if error:
+                return None, error
+            result[surat_type] = updated
+        return result, None
+
+    def get_readers(self, surat_type, surat_id, page=1, per_page=10):
+        """
+        Daftar user yang sudah membuka surat (read receipt), urut sesuai waktu
+        membuka, dengan paginasi.
+
+        Returns:
+            tuple: ({"readers": [Row], "pagination": dict}, error_message)
+        """
+        model = SURAT_MODELS[surat_type]
+        db = get_db()
+        offset = (page - 1) * per_page
+        # Hanya potongan halaman ini yang diambil dari array (indeks Postgres mulai dari 1),
+        # ditambah apakah setiap receipt yang masih di buffer sudah ada di array
+        pending = read_receipt_buffer.pending(surat_type, surat_id)
+        found = db.execute(
+            select(
+                read_count(model),
+                model.dibaca_oleh_id[offset + 1:offset + per_page],
+                *[model.dibaca_oleh_id.any(user_id) for user_id in pending]
+            ).where(model.id == surat_id)
+        ).first()
+        if found is None:
+            return None, "Surat tidak ditemukan"
+
+        # Receipt yang masih di buffer ikut ditampilkan, sebagai pembaca terakhir
+        stored_total, page_ids, *already_stored = found
+        page_ids = list(page_ids or [])
+        pending = [user_id for user_id, stored in zip(pending, already_stored) if not stored]
+        pending_offset = max(offset - stored_total, 0)
+        page_ids += pending[pending_offset:pending_offset + per_page - len(page_ids)]
+        total = stored_total + len(pending)
+
+        users = {
+            row.id: row
+            for row in db.query(User.id, User.nama_lengkap, User.role, User.divisi).filter(User.id.in_(page_ids))
+        }
+        readers = [users[user_id] for user_id in page_ids if user_id in users]
+        pagination = {
+            "total": total,
+            "page": page,
+            "per_page": per_page,
+            "total_pages": (total + per_page - 1) // per_page
+        }
+        return {"readers": readers, "pagination": pagination}, None
+
+    def compact_all(self, db):
+        """
+        Padatkan watermark semua user yang punya pengecualian, untuk dijalankan
+        berkala (compact_read_state.py).
+
+        Returns:
+            int: jumlah pasangan (user, tipe surat) yang diproses
+        """
+        pairs = db.execute(
+            select(ReadException.user_id, ReadException.surat_type).distinct()
+        ).all()
+        users = {user.id: user for user in db.query(User).filter(User.id.in_({user_id for user_id, _ in pairs}))}
+        for user_id, surat_type in pairs:
+            if user_id in users and surat_type in SURAT_MODELS:
+                self._compact(db, surat_type, users[user_id])
+        return len(pairs)
+
+    def forget_surat(self, db, surat_type, surat_id):
+        # Dipanggil saat surat dihapus
+        db.execute(
+            delete(ReadException)
+            .where(ReadException.surat_type == surat_type, ReadException.surat_id == surat_id)
+            .execution_options(synchronize_session=False)
+        )
+
+# Create a singleton instance
+read_state_service = ReadStateService()
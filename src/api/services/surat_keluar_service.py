@@ -1,131 +1,173 @@
-from src.database.config import SessionLocal
-from src.database.models import SuratKeluar, User, SuratMasuk
+from functools import partial
+from src.database.session import get_db, on_commit
+from src.database.models import SuratKeluar, User
 from datetime import datetime
-import os
 from werkzeug.utils import secure_filename
-from sqlalchemy import or_
-from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError
+from src.utils.pagination_helper import paginate_keyset, paginate_offset
+from src.utils.count_helper import count_cache, count_total, filter_fingerprint
+from src.utils.search_helper import build_search_filter
+from src.utils.read_state_helper import is_read, read_count
+from src.utils.file_storage_helper import store_upload, release_surat_file
+from src.utils.nomor_surat_helper import (
+    register_nomor_surat, rename_nomor_surat, unregister_nomor_surat,
+    duplicate_nomor_surat_message, is_duplicate_nomor_surat
+)
+from src.api.services.notification_service import notification_service
+from src.api.services.read_state_service import read_state_service
+from src.api.services.dashboard_service import invalidate_dashboard_stats, invalidate_timeseries
 
 class SuratKeluarService:
-    def __init__(self):
-        self.upload_folder = "src/storage/surat_keluar/"
-        os.makedirs(self.upload_folder, exist_ok=True)
+    # Kolom yang dibutuhkan respons list; dipilih langsung tanpa memuat entitas ORM
+    LIST_COLUMNS = (
+        SuratKeluar.id,
+        SuratKeluar.nomor_surat,
+        SuratKeluar.tanggal_surat,
+        SuratKeluar.tanggal_kirim,
+        SuratKeluar.ditujukan_kepada,
+        SuratKeluar.perihal,
+        SuratKeluar.keterangan,
+        SuratKeluar.divisi,
+        SuratKeluar.inserted_at,
+        read_count(SuratKeluar).label('read_count')
+    )
+    # Nama kolom file export, sesuai urutan kolom baris iter_export_rows
+    EXPORT_COLUMNS = [column.key for column in LIST_COLUMNS] + ['inserted_by']
 
-    def _validate_nomor_surat(self, nomor_surat, exclude_id=None):
+    # Jumlah baris yang diambil dari cursor database per batch saat export
+    EXPORT_BATCH_SIZE = 1000
+
+    def _row_query(self, db, user_id=None):
+        # Query kolom untuk respons list/detail, dengan `is_read` untuk user yang meminta
+        columns = [*self.LIST_COLUMNS, User.nama_lengkap.label('inserted_by')]
+        if user_id is not None:
+            columns.append(is_read('surat_keluar', user_id, SuratKeluar.id, SuratKeluar.inserted_at).label('is_read'))
+        return db.query(*columns).outerjoin(User, SuratKeluar.inserted_by_id == User.id)
+
+    def _list_filters(self, db, search=None, start_date=None, end_date=None, divisi=None):
         """
-        Validate if nomor surat already exists in database
-        
-        Args:
-            nomor_surat (str): Nomor surat to validate
-            exclude_id (int, optional): ID to exclude from validation (for updates)
-            
+        Filter list surat keluar.
+
         Returns:
-            tuple: (is_valid, error_message)
+            tuple: (filters, rank) dengan rank berupa ekspresi relevansi pencarian atau None
         """
-        db = SessionLocal()
-        try:
-            query = db.query(SuratKeluar).filter(SuratKeluar.nomor_surat == nomor_surat)
-            
-            if exclude_id:
-                query = query.filter(SuratKeluar.id != exclude_id)
-            
-            existing_surat = query.first()
-            
-            if existing_surat:
-                return False, f"Nomor surat '{nomor_surat}' sudah dimasukkan"
-            
-            query = db.query(SuratMasuk).filter(SuratMasuk.nomor_surat == nomor_surat)
-            
-            if exclude_id:
-                query = query.filter(SuratMasuk.id != exclude_id)
-            
-            existing_surat = query.first()
+        filters = []
+        rank = None
+        if search:
+            condition, rank = build_search_filter(db, SuratKeluar, search)
+            if condition is not None:
+                filters.append(condition)
 
-            if existing_surat:
-                return False, f"Nomor surat '{nomor_surat}' sudah dimasukkan di surat masuk"
-            
-            return True, None
-        finally:
-            db.close()
+        if start_date:
+            filters.append(SuratKeluar.tanggal_surat >= start_date)
+        if end_date:
+            filters.append(SuratKeluar.tanggal_surat <= end_date)
 
-    def get_surat_keluar(self, page=1, per_page=10, search=None, start_date=None, end_date=None, divisi=None):
-        db = SessionLocal()
-        try:
-            query = db.query(SuratKeluar).options(
-                joinedload(SuratKeluar.inserted_by)
-            )
+        if divisi:
+            filters.append(SuratKeluar.divisi == divisi)
+
+        return filters, rank
+
+    def get_surat_keluar(self, page=1, per_page=10, search=None, start_date=None, end_date=None, divisi=None, cursor=None, count_mode='exact', user_id=None):
+        """
+        Ambil daftar surat keluar dengan filter dan paginasi. Baris yang dikembalikan
+        berupa Row berisi LIST_COLUMNS ditambah `inserted_by` (nama lengkap), dan
+        `is_read` jika `user_id` diberikan.
 
-            # Apply filters
-            if search:
-                search = f"%{search}%"
-                query = query.filter(
-                    or_(
-                        SuratKeluar.nomor_surat.ilike(search),
-                        SuratKeluar.perihal.ilike(search),
-                        SuratKeluar.ditujukan_kepada.ilike(search),
-                        SuratKeluar.keterangan.ilike(search)
-                    )
-                )
-
-            if start_date:
-                query = query.filter(SuratKeluar.tanggal_surat >= start_date)
-            if end_date:
-                query = query.filter(SuratKeluar.tanggal_surat <= end_date)
-
-            if divisi:
-                query = query.filter(SuratKeluar.divisi == divisi)
-
-            # Get total count
-            total = query.count()
-
-            # Apply pagination
-            surat_list = query.order_by(SuratKeluar.tanggal_surat.desc())\
-                .offset((page - 1) * per_page)\
-                .limit(per_page)\
-                .all()
+        Jika `cursor` diberikan (string kosong untuk halaman pertama), paginasi
+        memakai keyset (tanggal_surat, id) dan `page` diabaikan. Tanpa `cursor`,
+        paginasi memakai page/offset seperti biasa.
 
+        Raises:
+            ValueError: Jika cursor tidak valid
+        """
+        db = get_db()
+        filters, rank = self._list_filters(db, search, start_date, end_date, divisi)
+        query = self._row_query(db, user_id).filter(*filters)
+
+        if cursor is not None:
+            surat_list, pagination = paginate_keyset(
+                query, SuratKeluar.tanggal_surat, SuratKeluar.id, per_page, cursor
+            )
             return {
                 "surat_list": surat_list,
-                "pagination": {
-                    "total": total,
-                    "page": page,
-                    "per_page": per_page,
-                    "total_pages": (total + per_page - 1) // per_page
-                }
+                "pagination": pagination
             }
-        finally:
-            db.close()
 
-    def get_surat_by_id(self, surat_id):
-        db = SessionLocal()
-        try:
-            return db.query(SuratKeluar).options(
-                joinedload(SuratKeluar.inserted_by)
-            ).filter(SuratKeluar.id == surat_id).first()
-        finally:
-            db.close()
+        # Get total count
+        count_fn = None
+        if count_mode != 'none':
+            fingerprint = filter_fingerprint(search, start_date, end_date, divisi)
+            count_query = db.query(SuratKeluar.id).filter(*filters)
+            count_fn = lambda: count_total(db, count_query, SuratKeluar.__tablename__, fingerprint, count_mode)
+
+        # Hasil pencarian diurutkan berdasarkan relevansi lebih dulu
+        order = [SuratKeluar.tanggal_surat.desc(), SuratKeluar.id.desc()]
+        if rank is not None:
+            order.insert(0, rank.desc())
+
+        # Apply pagination
+        surat_list, pagination = paginate_offset(query, order, page, per_page, count_fn)
+
+        return {
+            "surat_list": surat_list,
+            "pagination": pagination
+        }
+
+    def iter_export_rows(self, db, search=None, start_date=None, end_date=None, divisi=None):
+        """
+        Semua surat keluar yang cocok dengan filter list, urut tanggal_surat.
+        Baris dibaca bertahap lewat server-side cursor (yield_per), sehingga
+        memori tetap kecil berapa pun jumlah suratnya.
+
+        `db` harus session milik response streaming (lihat stream_db), karena
+        session request sudah ditutup saat body response dikirim.
+        """
+        filters, _ = self._list_filters(db, search, start_date, end_date, divisi)
+        return self._row_query(db)\
+            .filter(*filters)\
+            .order_by(SuratKeluar.tanggal_surat, SuratKeluar.id)\
+            .yield_per(self.EXPORT_BATCH_SIZE)
+
+    def iter_file_rows(self, db, search=None, start_date=None, end_date=None, divisi=None):
+        """
+        Nomor surat dan file dari semua surat keluar yang cocok dengan filter
+        list, untuk download arsip ZIP. Dibaca bertahap seperti iter_export_rows.
+        """
+        filters, _ = self._list_filters(db, search, start_date, end_date, divisi)
+        return db.query(SuratKeluar.nomor_surat, SuratKeluar.file_path, SuratKeluar.file_name)\
+            .filter(*filters)\
+            .order_by(SuratKeluar.tanggal_surat, SuratKeluar.id)\
+            .yield_per(self.EXPORT_BATCH_SIZE)
+
+    def get_surat_detail(self, surat_id, user_id=None):
+        """
+        Satu surat sebagai Row dengan kolom yang sama seperti list.
+        """
+        db = get_db()
+        return self._row_query(db, user_id).filter(SuratKeluar.id == surat_id).first()
+
+    def get_file_info(self, surat_id):
+        """
+        Hanya kolom yang dibutuhkan untuk download file (path, hash, nama asli).
+        """
+        db = get_db()
+        return db.query(SuratKeluar.file_path, SuratKeluar.file_hash, SuratKeluar.file_name)\
+            .filter(SuratKeluar.id == surat_id)\
+            .first()
 
     def create_surat(self, data, file, user_id):
-        db = SessionLocal()
+        db = get_db()
         try:
             if not file:
                 return None, "File surat harus diupload"
 
-            # Validate nomor surat - check if already exists
-            is_valid, error_message = self._validate_nomor_surat(data['nomor_surat'])
-            if not is_valid:
-                return None, error_message
-            
             # Validate tanggal surat atau tanggal kirim - check if tanggal surat or tanggal kirim is greater than tanggal saat ini
             if datetime.strptime(data['tanggal_surat'], '%Y-%m-%d') > datetime.now() or datetime.strptime(data['tanggal_kirim'], '%Y-%m-%d') > datetime.now():
                 return None, "Tanggal surat atau tanggal kirim tidak boleh lebih besar dari tanggal saat ini"
 
-            # Save file
-            filename = secure_filename(file.filename)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"{timestamp}_{filename}"
-            file_path = os.path.join(self.upload_folder, filename)
-            file.save(file_path)
+            # Save file (disimpan per hash isi; upload yang sama memakai file yang sama)
+            file_hash, file_path = store_upload(db, file)
 
             # Create surat
             surat = SuratKeluar(
@@ -137,38 +179,50 @@ class SuratKeluarService:
                 keterangan=data.get('keterangan'),
                 divisi=data['divisi'],
                 file_path=file_path,
+                file_hash=file_hash,
+                file_name=secure_filename(file.filename),
                 inserted_by_id=user_id,
                 inserted_at=datetime.now(),
                 dibaca_oleh_id=[]
             )
 
             db.add(surat)
-            db.commit()
-            db.refresh(surat)
+            notification_service.record_surat_added(db, 'surat_keluar', surat.divisi)
+            db.flush()
+            # Nomor yang sudah dipakai ditolak oleh constraint unik (IntegrityError)
+            register_nomor_surat(db, 'surat_keluar', surat.id, surat.nomor_surat)
+            on_commit(partial(count_cache.invalidate, SuratKeluar.__tablename__))
+            on_commit(invalidate_dashboard_stats)
+            on_commit(partial(invalidate_timeseries, surat.tanggal_surat))
+            notification_service.publish_surat_created('surat_keluar', surat)
             return surat, None
+        except IntegrityError as e:
+            db.rollback()
+            if is_duplicate_nomor_surat(e):
+                return None, duplicate_nomor_surat_message(db, 'surat_keluar', data['nomor_surat'])
+            return None, str(e)
         except Exception as e:
             db.rollback()
             return None, str(e)
-        finally:
-            db.close()
 
     def update_surat(self, surat_id, data, file, user_id):
-        db = SessionLocal()
+        db = get_db()
         try:
             surat = db.query(SuratKeluar).filter(SuratKeluar.id == surat_id).first()
             if not surat:
                 return None, "Surat tidak ditemukan"
             
-            # Validate nomor surat if it's being updated - check if already exists (excluding current surat)
+            # Nomor surat baru langsung dicatat di registry; nomor yang sudah dipakai
+            # ditolak constraint unik sebelum file lama disentuh
             if 'nomor_surat' in data and data['nomor_surat'] != surat.nomor_surat:
-                is_valid, error_message = self._validate_nomor_surat(data['nomor_surat'], exclude_id=surat_id)
-                if not is_valid:
-                    return None, error_message
-                
+                rename_nomor_surat(db, 'surat_keluar', surat_id, data['nomor_surat'])
+
             # Validate tanggal surat atau tanggal kirim - check if tanggal surat or tanggal kirim is greater than tanggal saat ini
             if datetime.strptime(data['tanggal_surat'], '%Y-%m-%d') > datetime.now() or datetime.strptime(data['tanggal_kirim'], '%Y-%m-%d') > datetime.now():
                 return None, "Tanggal surat atau tanggal kirim tidak boleh lebih besar dari tanggal saat ini"
 
+            old_tanggal_surat = surat.tanggal_surat
+
             # Update fields
             if 'nomor_surat' in data:
                 surat.nomor_surat = data['nomor_surat']
@@ -182,84 +236,66 @@ class SuratKeluarService:
                 surat.perihal = data['perihal']
             if 'keterangan' in data:
                 surat.keterangan = data['keterangan']
-            if 'divisi' in data:
+            if 'divisi' in data and data['divisi'] != surat.divisi:
+                # Surat pindah divisi: pindahkan juga counter belum dibaca
+                notification_service.record_surat_removed(db, 'surat_keluar', surat.divisi, surat)
+                notification_service.record_surat_added(db, 'surat_keluar', data['divisi'], surat)
                 surat.divisi = data['divisi']
 
             # Handle file upload if provided
             if file:
-                # Delete old file if exists
-                if surat.file_path and os.path.exists(surat.file_path):
-                    os.remove(surat.file_path)
-
-                # Save new file
-                filename = secure_filename(file.filename)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                filename = f"{timestamp}_{filename}"
-                file_path = os.path.join(self.upload_folder, filename)
-                file.save(file_path)
+                # Simpan file baru, lalu lepas referensi file lama; file lama baru
+                # dihapus setelah commit dan hanya jika tidak dipakai surat lain
+                file_hash, file_path = store_upload(db, file)
+                release_surat_file(db, surat)
                 surat.file_path = file_path
+                surat.file_hash = file_hash
+                surat.file_name = secure_filename(file.filename)
 
-            db.commit()
-            db.refresh(surat)
+            db.flush()
+            on_commit(partial(count_cache.invalidate, SuratKeluar.__tablename__))
+            on_commit(invalidate_dashboard_stats)
+            on_commit(partial(invalidate_timeseries, old_tanggal_surat, surat.tanggal_surat))
             return surat, None
+        except IntegrityError as e:
+            db.rollback()
+            if is_duplicate_nomor_surat(e):
+                return None, duplicate_nomor_surat_message(db, 'surat_keluar', data['nomor_surat'])
+            return None, str(e)
         except Exception as e:
             db.rollback()
             return None, str(e)
-        finally:
-            db.close()
 
     def delete_surat(self, surat_id):
-        db = SessionLocal()
+        db = get_db()
         try:
             surat = db.query(SuratKeluar).filter(SuratKeluar.id == surat_id).first()
             if not surat:
                 return False, "Surat tidak ditemukan"
 
-            # Delete file if exists
-            if surat.file_path and os.path.exists(surat.file_path):
-                os.remove(surat.file_path)
-
+            # File dihapus setelah commit jika tidak dipakai surat lain
+            release_surat_file(db, surat)
+            notification_service.record_surat_removed(db, 'surat_keluar', surat.divisi, surat)
+            read_state_service.forget_surat(db, 'surat_keluar', surat.id)
+            unregister_nomor_surat(db, 'surat_keluar', surat.id)
             db.delete(surat)
-            db.commit()
+            db.flush()
+            on_commit(partial(count_cache.invalidate, SuratKeluar.__tablename__))
+            on_commit(invalidate_dashboard_stats)
+            on_commit(partial(invalidate_timeseries, surat.tanggal_surat))
             return True, None
         except Exception as e:
             db.rollback()
             return False, str(e)
-        finally:
-            db.close()
-
-    def mark_as_read(self, surat_id, user_id):
-        db = SessionLocal()
-        try:
-            surat = db.query(SuratKeluar).filter(SuratKeluar.id == surat_id).first()
-            if not surat:
-                db.close()
-                return False, "Surat tidak ditemukan"
 
-            # Check if user exists
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user:
-                db.close()
-                return False, "User tidak ditemukan"
+    def mark_as_read(self, surat_id, user):
+        return read_state_service.mark_as_read('surat_keluar', surat_id, user)
 
-            # Initialize dibaca_oleh_id if it's None
-            if surat.dibaca_oleh_id is None:
-                surat.dibaca_oleh_id = []
+    def mark_many_as_read(self, user, ids=None, before=None):
+        return read_state_service.mark_many_as_read('surat_keluar', user, ids=ids, before=before)
 
-            # Add user_id if not already present
-            if user_id not in surat.dibaca_oleh_id:
-                new_dibaca_oleh_id = list(surat.dibaca_oleh_id)
-                new_dibaca_oleh_id.append(user_id)
-                surat.dibaca_oleh_id = new_dibaca_oleh_id
-                
-                db.commit()
-
-            return True, None
-        except Exception as e:
-            db.rollback()
-            return False, str(e)
-        finally:
-            db.close()
+    def get_readers(self, surat_id, page=1, per_page=10):
+        return read_state_service.get_readers('surat_keluar', surat_id, page, per_page)
 
 # Create singleton instance
 surat_keluar_service = SuratKeluarService() 
\ No newline at end of file
@@ -1,5 +1,9 @@
-from src.database.config import SessionLocal
+from functools import partial
+from src.database.session import get_db, on_commit
 from src.database.models import User
+from src.utils.jwt_helper import invalidate_principal
+from src.api.services.notification_service import notification_service
+from src.api.services.dashboard_service import invalidate_dashboard_stats
 from werkzeug.security import generate_password_hash
 import random
 import string
@@ -24,61 +28,56 @@ class UserService:
         return ''.join(random.choice(characters) for _ in range(length))
 
     def get_users(self, page=1, per_page=10, search=None, role=None, divisi=None):
-        session = SessionLocal()
-        try:
-            # Base query
-            query = session.query(User)
-
-            # Apply filters if provided
-            if search:
-                search_term = f"%{search}%"
-                query = query.filter(
-                    or_(
-                        User.username.ilike(search_term),
-                        User.nama_lengkap.ilike(search_term)
-                    )
+        session = get_db()
+        # Base query
+        query = session.query(User)
+
+        # Apply filters if provided
+        if search:
+            search_term = f"%{search}%"
+            query = query.filter(
+                or_(
+                    User.username.ilike(search_term),
+                    User.nama_lengkap.ilike(search_term)
                 )
-            
-            if role:
-                query = query.filter(User.role == role)
-            
-            if divisi:
-                query = query.filter(User.divisi == divisi)
-
-            # Get total count before pagination
-            total = query.count()
-
-            # Apply pagination
-            users = query.order_by(User.username.asc())\
-                        .offset((page - 1) * per_page)\
-                        .limit(per_page)\
-                        .all()
-
-            # Calculate pagination info
-            total_pages = (total + per_page - 1) // per_page
-
-            return {
-                "users": users,
-                "pagination": {
-                    "total": total,
-                    "per_page": per_page,
-                    "current_page": page,
-                    "total_pages": total_pages,
-                    "has_next": page < total_pages,
-                    "has_prev": page > 1
-                }
+            )
+        
+        if role:
+            query = query.filter(User.role == role)
+        
+        if divisi:
+            query = query.filter(User.divisi == divisi)
+
+        # Get total count before pagination
+        total = query.count()
+
+        # Apply pagination
+        users = query.order_by(User.username.asc())\
+                    .offset((page - 1) * per_page)\
+                    .limit(per_page)\
+                    .all()
+
+        # Calculate pagination info
+        total_pages = (total + per_page - 1) // per_page
+
+        return {
+            "users": users,
+            "pagination": {
+                "total": total,
+                "per_page": per_page,
+                "current_page": page,
+                "total_pages": total_pages,
+                "has_next": page < total_pages,
+                "has_prev": page > 1
             }
-        finally:
-            session.close()
+        }
 
     def get_user(self, user_id):
-        session = SessionLocal()
-        user = session.query(User).filter(User.id == user_id).first()
-        session.close()
-        return user
+        session = get_db()
+        return session.query(User).filter(User.id == user_id).first()
 
     def create_user(self, nama_lengkap, role, divisi):
-        session = SessionLocal()
+        session = get_db()
         try:
             # Validasi nama_lengkap unik
             existing_user = session.query(User).filter(User.nama_lengkap == nama_lengkap).first()
@@ -107,23 +106,20 @@ class UserService:
                 divisi=divisi
             )
             session.add(new_user)
-            session.commit()
-            session.refresh(new_user)
+            session.flush()
             # Update username dengan ID yang sudah ada
             new_username = self.generate_username(nama_lengkap, new_user.id)
             new_user.username = new_username
             new_user.password_hash = generate_password_hash(new_username)
-            session.commit()
-            session.refresh(new_user)
+            session.flush()
+            on_commit(invalidate_dashboard_stats)
             return new_user, None
         except Exception as e:
             session.rollback()
             return None, str(e)
-        finally:
-            session.close()
 
     def update_user(self, user_id, data):
-        session = SessionLocal()
+        session = get_db()
         try:
             user = session.query(User).filter(User.id == user_id).first()
             if not user:
@@ -162,52 +158,53 @@ class UserService:
                         return None, f"Sudah ada Kepala Sub Bagian untuk divisi {new_divisi}."
                 user.divisi = new_divisi
 
+            # Role/divisi menentukan surat yang terlihat, hitung ulang counter belum dibaca
+            if 'role' in data or 'divisi' in data:
+                notification_service.reset_unread_counts(session, user_id)
+
             # If nama_lengkap changed, update username and password_hash
             if nama_lengkap_changed:
                 new_username = self.generate_username(user.nama_lengkap, user.id)
                 user.username = new_username
                 user.password_hash = generate_password_hash(new_username)
 
-            session.commit()
-            session.refresh(user)
+            session.flush()
+            on_commit(partial(invalidate_principal, user_id))
             return user, None
         except Exception as e:
             session.rollback()
             return None, str(e)
-        finally:
-            session.close()
 
     def update_password(self, user_id, new_password):
-        session = SessionLocal()
+        session = get_db()
         try:
             user = session.query(User).filter(User.id == user_id).first()
             if not user:
                 return False, "User not found"
 
             user.password_hash = generate_password_hash(new_password)
-            session.commit()
+            session.flush()
+            on_commit(partial(invalidate_principal, user_id))
             return True, None
         except Exception as e:
             session.rollback()
             return False, str(e)
-        finally:
-            session.close()
 
     def delete_user(self, user_id):
-        session = SessionLocal()
+        session = get_db()
         try:
             user = session.query(User).filter(User.id == user_id).first()
             if not user:
                 return False, "User not found"
 
             session.delete(user)
-            session.commit()
+            session.flush()
+            on_commit(partial(invalidate_principal, user_id))
+            on_commit(invalidate_dashboard_stats)
             return True, None
         except Exception as e:
             session.rollback()
             return False, str(e)
-        finally:
-            session.close()
 
 # Create a singleton instance
 user_service = UserService()
\ No newline at end of file
@@ -1,21 +1,108 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
+from src.database.pool import InstrumentedQueuePool, InstrumentedNullPool, install_idle_pre_ping
+from src.database.routing import ReplicaSet, RoutingSession
 import os
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Read replica opsional (dipisah koma). Request GET dibaca dari replica secara
+# bergiliran; user yang baru menulis dibaca dari primary selama REPLICA_RYW_SECONDS
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_RYW_SECONDS = int(os.getenv("REPLICA_RYW_SECONDS", "5"))
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your_jwt_secret")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=20,  # Increase pool size
-    max_overflow=30,  # Increase max overflow
-    pool_timeout=60,  # Increase timeout to 60 seconds
-    pool_recycle=3600,  # Recycle connections after 1 hour
-    pool_pre_ping=True  # Enable connection health checks
+# Pool koneksi database per proses worker. Total koneksi ke Postgres bisa
+# mencapai jumlah_worker * (DB_POOL_SIZE + DB_MAX_OVERFLOW), sesuaikan dengan
+# max_connections server. DB_POOL_MODE "null" membuka koneksi baru setiap
+# checkout dan menutupnya setelah dipakai, untuk deployment di belakang pgbouncer.
+# Default pool sama dengan konfigurasi engine sebelumnya (20 + 30 overflow, timeout 60).
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "queue")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "60"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+# Koneksi di-ping saat checkout hanya jika sudah idle lebih dari ini (detik);
+# 0 untuk ping setiap checkout, -1 untuk mematikan ping
+DB_PRE_PING_IDLE_SECONDS = int(os.getenv("DB_PRE_PING_IDLE_SECONDS", "30"))
+
+# Lama (detik) data user yang login disimpan di cache proses; 0 untuk mematikan cache
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+
+# Konfigurasi text search Postgres untuk pencarian surat
+SEARCH_TEXT_CONFIG = os.getenv("SEARCH_TEXT_CONFIG", "simple")
+
+# Lama (detik) jumlah total hasil filter list surat disimpan di cache
+COUNT_CACHE_TTL = int(os.getenv("COUNT_CACHE_TTL", "300"))
+
+# Lama (detik) snapshot statistik dashboard disimpan; perubahan data di worker yang sama langsung menginvalidasi
+DASHBOARD_SNAPSHOT_TTL = int(os.getenv("DASHBOARD_SNAPSHOT_TTL", "60"))
+# Lama (detik) bucket time-series yang sudah lewat disimpan di cache
+TIMESERIES_CACHE_TTL = int(os.getenv("TIMESERIES_CACHE_TTL", "86400"))
+
+# Query yang lebih lama dari ini (milidetik) dicatat di log slow query
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", "200"))
+# Peringatan N+1 jika satu bentuk statement dijalankan lebih dari ini dalam satu request
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+
+# Direktori file upload surat, disimpan per hash isi (ab/cd/<sha256>)
+FILE_STORAGE_ROOT = os.getenv("FILE_STORAGE_ROOT", "src/storage/blobs")
+# Pengiriman isi file diserahkan ke reverse proxy: "" (dikirim Flask), "x-accel"
+# (nginx, internal location FILE_ACCEL_PREFIX -> FILE_STORAGE_ROOT) atau "x-sendfile"
+FILE_OFFLOAD = os.getenv("FILE_OFFLOAD", "")
+FILE_ACCEL_PREFIX = os.getenv("FILE_ACCEL_PREFIX", "/_protected/")
+# URL download bertanda tangan (HMAC) tanpa login: kunci penanda tangan dan
+# masa berlaku minimal (detik). Ganti FILE_URL_SECRET untuk mencabut semua URL.
+# Jika kosong, kunci diturunkan (HKDF) dari JWT_SECRET_KEY, bukan dipakai langsung
+FILE_URL_SECRET = os.getenv("FILE_URL_SECRET")
+FILE_URL_TTL = int(os.getenv("FILE_URL_TTL", "300"))
+
+# Read receipt (dibaca_oleh_id) ditulis bertahap: di-flush setiap interval (milidetik)
+# atau saat jumlah receipt tertunda mencapai batas. 0 = tulis langsung di request
+READ_RECEIPT_FLUSH_MS = int(os.getenv("READ_RECEIPT_FLUSH_MS", "500"))
+READ_RECEIPT_FLUSH_MAX = int(os.getenv("READ_RECEIPT_FLUSH_MAX", "500"))
+# Watermark baca dipadatkan saat menandai dibaca hanya jika pengecualian user
+# (per tipe surat) sudah mencapai jumlah ini; selebihnya lewat compact_read_state.py
+READ_EXCEPTION_COMPACT_THRESHOLD = int(os.getenv("READ_EXCEPTION_COMPACT_THRESHOLD", "200"))
+
+# Backend event bus notifikasi realtime dan invalidasi cache antar worker: "memory"
+# (satu proses) atau "postgres" (LISTEN/NOTIFY, wajib jika worker lebih dari satu)
+EVENT_BUS_BACKEND = os.getenv("EVENT_BUS_BACKEND", "memory")
+EVENT_BUS_CHANNEL = os.getenv("EVENT_BUS_CHANNEL", "surat_events")
+# Interval (detik) komentar keep-alive pada stream SSE
+SSE_KEEPALIVE_SECONDS = int(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+# Lama maksimum (detik) satu koneksi SSE; setelahnya stream ditutup dan client
+# menyambung ulang (EventSource otomatis), sehingga worker tidak tertahan selamanya
+SSE_MAX_SECONDS = int(os.getenv("SSE_MAX_SECONDS", "1800"))
+
+if DB_POOL_MODE == "null":
+    # Tanpa pool di aplikasi; koneksi dikelola pooler eksternal (pgbouncer)
+    pool_options = {"poolclass": InstrumentedNullPool}
+elif DB_POOL_MODE == "queue":
+    pool_options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE
+    }
+else:
+    raise ValueError(f"Unknown DB_POOL_MODE: {DB_POOL_MODE}")
+
+engine = create_engine(DATABASE_URL, **pool_options)
+replica_engines = [create_engine(url, **pool_options) for url in DATABASE_REPLICA_URLS]
+if DB_POOL_MODE == "queue":
+    for pooled_engine in [engine, *replica_engines]:
+        install_idle_pre_ping(pooled_engine, DB_PRE_PING_IDLE_SECONDS)
+
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    replicas=ReplicaSet(replica_engines),
+    autocommit=False,
+    autoflush=False,
+    bind=engine
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
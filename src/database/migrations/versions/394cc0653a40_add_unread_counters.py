@@ -0,0 +1,36 @@
+"""add unread counters
+
+Revision ID: 394cc0653a40
+Revises: cae5bf2d7435
+Create Date: 2026-10-18 11:26:54.730912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '394cc0653a40'
+down_revision: Union[str, None] = 'cae5bf2d7435'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Baris counter dibuat otomatis saat pertama kali dibutuhkan,
+    # atau sekaligus untuk semua user lewat rebuild_unread_counters.py
+    op.create_table('unread_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('surat_type', sa.String(), nullable=False),
+    sa.Column('unread_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'surat_type')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('unread_counters')
@@ -0,0 +1,115 @@
+"""add read watermarks
+
+Revision ID: 455970ab8f7a
+Revises: 394cc0653a40
+Create Date: 2026-10-18 13:41:08.522170
+
+Status baca per user dipindah ke watermark per tipe surat ditambah
+pengecualian di atasnya, diisi dari dibaca_oleh_id dan tabel asosiasi
+surat_*_dibaca_oleh (yang tidak dipakai aplikasi dan dihapus di sini).
+dibaca_oleh_id tetap disimpan sebagai daftar read receipt.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '455970ab8f7a'
+down_revision: Union[str, None] = '394cc0653a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tipe surat, tabel, tabel asosiasi, kolom id surat di tabel asosiasi)
+SOURCES = (
+    ('surat_masuk', 'surat_masuk', 'surat_masuk_dibaca_oleh', 'surat_masuk_id'),
+    ('surat_keluar', 'surat_keluar', 'surat_keluar_dibaca_oleh', 'surat_keluar_id'),
+)
+
+
+def _backfill(surat_type, table, association, association_id):
+    # Surat dianggap dibaca user jika user ada di dibaca_oleh_id atau di tabel asosiasi
+    read_by_user = f"""(
+        (s.dibaca_oleh_id IS NOT NULL AND u.id = ANY(s.dibaca_oleh_id))
+        OR EXISTS (SELECT 1 FROM {association} a WHERE a.{association_id} = s.id AND a.user_id = u.id)
+    )"""
+
+    # Watermark: inserted_at terbaru sebelum surat tertua yang belum dibaca,
+    # dihitung dari surat yang terlihat oleh user (divisinya, atau semua untuk sekertaris)
+    op.execute(f"""
+        WITH visible AS (
+            SELECT u.id AS user_id, s.inserted_at, {read_by_user} AS is_read
+            FROM users u
+            JOIN {table} s ON u.role = 'sekertaris' OR s.divisi = u.divisi
+            WHERE s.inserted_at IS NOT NULL
+        ), first_unread AS (
+            SELECT user_id, min(inserted_at) FILTER (WHERE NOT is_read) AS first_unread
+            FROM visible
+            GROUP BY user_id
+        )
+        INSERT INTO read_watermarks (user_id, surat_type, read_through)
+        SELECT v.user_id, '{surat_type}', max(v.inserted_at)
+        FROM visible v
+        JOIN first_unread f ON f.user_id = v.user_id
+        WHERE f.first_unread IS NULL OR v.inserted_at < f.first_unread
+        GROUP BY v.user_id
+    """)
+
+    # Pengecualian: surat yang sudah dibaca tetapi berada di atas watermark
+    op.execute(f"""
+        INSERT INTO read_exceptions (user_id, surat_type, surat_id)
+        SELECT u.id, '{surat_type}', s.id
+        FROM {table} s
+        JOIN users u ON {read_by_user}
+        LEFT JOIN read_watermarks w ON w.user_id = u.id AND w.surat_type = '{surat_type}'
+        WHERE w.read_through IS NULL OR s.inserted_at IS NULL OR s.inserted_at > w.read_through
+    """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('read_watermarks',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('surat_type', sa.String(), nullable=False),
+    sa.Column('read_through', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'surat_type')
+    )
+    op.create_table('read_exceptions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('surat_type', sa.String(), nullable=False),
+    sa.Column('surat_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'surat_type', 'surat_id')
+    )
+    op.create_index('ix_read_exceptions_surat', 'read_exceptions', ['surat_type', 'surat_id'], unique=False)
+
+    for source in SOURCES:
+        _backfill(*source)
+
+    op.drop_table('surat_masuk_dibaca_oleh')
+    op.drop_table('surat_keluar_dibaca_oleh')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Tabel asosiasi dibuat kembali kosong; status baca tetap ada di dibaca_oleh_id
+    op.create_table('surat_keluar_dibaca_oleh',
+    sa.Column('surat_keluar_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['surat_keluar_id'], ['surat_keluar.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('surat_keluar_id', 'user_id')
+    )
+    op.create_table('surat_masuk_dibaca_oleh',
+    sa.Column('surat_masuk_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['surat_masuk_id'], ['surat_masuk.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('surat_masuk_id', 'user_id')
+    )
+    op.drop_index('ix_read_exceptions_surat', table_name='read_exceptions')
+    op.drop_table('read_exceptions')
+    op.drop_table('read_watermarks')
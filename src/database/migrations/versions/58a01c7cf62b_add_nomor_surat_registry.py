@@ -0,0 +1,51 @@
+"""add nomor surat registry
+
+Revision ID: 58a01c7cf62b
+Revises: 455970ab8f7a
+Create Date: 2026-10-18 15:02:47.318904
+
+Registry nomor surat gabungan surat masuk dan surat keluar, sehingga nomor
+unik di kedua tabel dijamin oleh constraint database, bukan pengecekan
+SELECT sebelum insert.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '58a01c7cf62b'
+down_revision: Union[str, None] = '455970ab8f7a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('nomor_surat_registry',
+    sa.Column('nomor_surat', sa.String(), nullable=False),
+    sa.Column('surat_type', sa.String(), nullable=False),
+    sa.Column('surat_id', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('nomor_surat')
+    )
+    op.create_index('uq_nomor_surat_registry_surat', 'nomor_surat_registry', ['surat_type', 'surat_id'], unique=True)
+
+    op.execute("""
+        INSERT INTO nomor_surat_registry (nomor_surat, surat_type, surat_id)
+        SELECT nomor_surat, 'surat_masuk', id FROM surat_masuk
+    """)
+    # Nomor yang terlanjur sama di surat masuk dan keluar tetap milik surat masuk;
+    # surat keluar tersebut didaftarkan saat nomornya diubah
+    op.execute("""
+        INSERT INTO nomor_surat_registry (nomor_surat, surat_type, surat_id)
+        SELECT nomor_surat, 'surat_keluar', id FROM surat_keluar
+        ON CONFLICT (nomor_surat) DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_nomor_surat_registry_surat', table_name='nomor_surat_registry')
+    op.drop_table('nomor_surat_registry')
@@ -0,0 +1,60 @@
+"""add search vector surat
+
+Revision ID: 69efb8d3298f
+Revises: 6d773942c4de
+Create Date: 2026-10-18 09:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from src.database.config import SEARCH_TEXT_CONFIG
+
+
+# revision identifiers, used by Alembic.
+revision: str = '69efb8d3298f'
+down_revision: Union[str, None] = '6d773942c4de'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Harus sama dengan SEARCH_FIELDS di src/utils/search_helper.py
+SEARCH_FIELDS = (
+    ('nomor_surat', 'A'),
+    ('perihal', 'B'),
+    ('ditujukan_kepada', 'C'),
+    ('keterangan', 'D'),
+)
+
+
+def _search_vector_sql():
+    # Normalisasi sama seperti tokenize(): huruf kecil, selain huruf/angka jadi spasi
+    parts = [
+        f"setweight(to_tsvector(:config, "
+        f"regexp_replace(lower(coalesce({field}, '')), '[^[:alnum:]]+', ' ', 'g')), '{weight}')"
+        for field, weight in SEARCH_FIELDS
+    ]
+    return ' || '.join(parts)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('surat_masuk', 'surat_keluar'):
+        op.add_column(table, sa.Column('search_vector', postgresql.TSVECTOR(), nullable=True))
+        op.execute(
+            sa.text(f"UPDATE {table} SET search_vector = {_search_vector_sql()}")
+            .bindparams(sa.bindparam('config', SEARCH_TEXT_CONFIG, type_=postgresql.REGCONFIG))
+        )
+        op.create_index(
+            f'ix_{table}_search_vector', table, ['search_vector'],
+            unique=False, postgresql_using='gin'
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('surat_keluar', 'surat_masuk'):
+        op.drop_index(f'ix_{table}_search_vector', table_name=table, postgresql_using='gin')
+        op.drop_column(table, 'search_vector')
@@ -0,0 +1,53 @@
+"""add file blobs
+
+Revision ID: b97d74cc855f
+Revises: 58a01c7cf62b
+Create Date: 2026-10-18 16:20:11.904617
+
+Storage file upload berbasis hash isi. File lama tetap di path lamanya
+(file_hash NULL) sampai dipindahkan dengan migrate_file_storage.py.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b97d74cc855f'
+down_revision: Union[str, None] = '58a01c7cf62b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SURAT_TABLES = ('surat_masuk', 'surat_keluar')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('file_blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    for table in SURAT_TABLES:
+        op.add_column(table, sa.Column('file_hash', sa.String(length=64), nullable=True))
+        op.add_column(table, sa.Column('file_name', sa.String(), nullable=True))
+        op.create_foreign_key(f'{table}_file_hash_fkey', table, 'file_blobs', ['file_hash'], ['sha256'])
+        # Nama asli file lama: nama file tanpa direktori dan prefix timestamp upload
+        op.execute(f"""
+            UPDATE {table}
+            SET file_name = regexp_replace(file_path, '^.*/([0-9]{{8}}_[0-9]{{6}}_)?', '')
+            WHERE file_path IS NOT NULL
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in SURAT_TABLES:
+        op.drop_constraint(f'{table}_file_hash_fkey', table, type_='foreignkey')
+        op.drop_column(table, 'file_name')
+        op.drop_column(table, 'file_hash')
+    op.drop_table('file_blobs')
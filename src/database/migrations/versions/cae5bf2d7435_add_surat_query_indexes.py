@@ -0,0 +1,84 @@
+"""add surat query indexes
+
+Revision ID: cae5bf2d7435
+Revises: 69efb8d3298f
+Create Date: 2026-10-18 10:03:27.118406
+
+Index dibuat dengan CREATE INDEX CONCURRENTLY sehingga migrasi ini aman
+dijalankan pada database yang sedang dipakai (tabel tidak dikunci untuk
+penulisan). Karena itu setiap index dibuat di luar transaksi.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cae5bf2d7435'
+down_revision: Union[str, None] = '69efb8d3298f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('surat_masuk', 'surat_keluar')
+
+# (nama index, kolom, unique) - disesuaikan dengan bentuk query di service
+INDEXES = (
+    # _validate_nomor_surat
+    ('uq_{table}_nomor_surat', ['nomor_surat'], True),
+    # list tanpa filter divisi / filter tanggal, urut tanggal_surat desc, id desc
+    ('ix_{table}_tanggal_surat_id', ['tanggal_surat', 'id'], False),
+    # list dengan filter divisi
+    ('ix_{table}_divisi_tanggal_surat_id', ['divisi', 'tanggal_surat', 'id'], False),
+    # notifikasi sekertaris, urut inserted_at desc
+    ('ix_{table}_inserted_at', ['inserted_at'], False),
+    # notifikasi per divisi
+    ('ix_{table}_divisi_inserted_at', ['divisi', 'inserted_at'], False),
+    # foreign key ke users
+    ('ix_{table}_inserted_by_id', ['inserted_by_id'], False),
+)
+
+
+def _check_duplicate_nomor_surat():
+    # Index unik gagal dibuat jika ada duplikat, dan CONCURRENTLY akan meninggalkan
+    # index INVALID. Periksa dulu supaya migrasi gagal dengan pesan yang jelas.
+    conn = op.get_bind()
+    for table in TABLES:
+        duplicates = conn.execute(sa.text(
+            f"SELECT nomor_surat FROM {table} GROUP BY nomor_surat HAVING count(*) > 1 LIMIT 10"
+        )).scalars().all()
+        if duplicates:
+            raise RuntimeError(
+                f"Tabel {table} memiliki nomor_surat duplikat: {', '.join(duplicates)}. "
+                "Perbaiki data tersebut sebelum menjalankan migrasi ini."
+            )
+
+
+def _is_offline():
+    return op.get_context().as_sql
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not _is_offline():
+        _check_duplicate_nomor_surat()
+
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            for name, columns, unique in INDEXES:
+                op.create_index(
+                    name.format(table=table), table, columns,
+                    unique=unique, if_not_exists=True, postgresql_concurrently=True
+                )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table in reversed(TABLES):
+            for name, _, _ in reversed(INDEXES):
+                op.drop_index(
+                    name.format(table=table), table_name=table,
+                    if_exists=True, postgresql_concurrently=True
+                )
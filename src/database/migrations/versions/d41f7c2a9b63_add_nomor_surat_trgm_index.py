@@ -0,0 +1,45 @@
+"""add nomor surat trgm index
+
+Revision ID: d41f7c2a9b63
+Revises: b97d74cc855f
+Create Date: 2026-10-18 17:05:42.318904
+
+Pencarian mencocokkan potongan nomor_surat dengan ILIKE '%...%' di samping
+full-text search. Index trigram (pg_trgm) membuat pencocokan substring itu
+tidak perlu membaca seluruh tabel. Dibuat CONCURRENTLY di luar transaksi.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41f7c2a9b63'
+down_revision: Union[str, None] = 'b97d74cc855f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('surat_masuk', 'surat_keluar')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            op.create_index(
+                f'ix_{table}_nomor_surat_trgm', table, ['nomor_surat'],
+                unique=False, if_not_exists=True, postgresql_concurrently=True,
+                postgresql_using='gin', postgresql_ops={'nomor_surat': 'gin_trgm_ops'}
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for table in reversed(TABLES):
+            op.drop_index(
+                f'ix_{table}_nomor_surat_trgm', table_name=table,
+                if_exists=True, postgresql_concurrently=True
+            )
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, Table, ARRAY
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, Boolean, DateTime, ForeignKey, Enum, Table, ARRAY, Text, Index
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 from src.database.config import Base
 import enum
@@ -15,20 +16,8 @@ class DivisiEnum(str, enum.Enum):
     logistik_dan_keuangan = "logistik_dan_keuangan"
     sdm_dan_parmas = "sdm_dan_parmas"
 
-# Association tables for many-to-many relationships
-surat_masuk_dibaca_oleh = Table(
-    'surat_masuk_dibaca_oleh',
-    Base.metadata,
-    Column('surat_masuk_id', Integer, ForeignKey('surat_masuk.id'), primary_key=True),
-    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True)
-)
-
-surat_keluar_dibaca_oleh = Table(
-    'surat_keluar_dibaca_oleh',
-    Base.metadata,
-    Column('surat_keluar_id', Integer, ForeignKey('surat_keluar.id'), primary_key=True),
-    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True)
-)
+# Dokumen pencarian teks (tsvector di Postgres); di database lain hanya placeholder
+SearchVector = TSVECTOR().with_variant(Text(), 'sqlite')
 
 class User(Base):
     __tablename__ = "users"
@@ -40,12 +29,33 @@ class User(Base):
     role = Column(Enum(RoleEnum))
     divisi = Column(Enum(DivisiEnum), nullable=True)
 
-    # Relationships
-    surat_masuk_dibaca = relationship("SuratMasuk", secondary=surat_masuk_dibaca_oleh, back_populates="dibaca_oleh")
-    surat_keluar_dibaca = relationship("SuratKeluar", secondary=surat_keluar_dibaca_oleh, back_populates="dibaca_oleh")
+class FileBlob(Base):
+    """
+    File upload yang disimpan sekali per isi (SHA-256). ref_count adalah jumlah
+    surat yang memakainya; file fisik dihapus setelah tidak ada lagi yang memakai.
+    """
+    __tablename__ = "file_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
 class SuratMasuk(Base):
     __tablename__ = "surat_masuk"
+    __table_args__ = (
+        Index('ix_surat_masuk_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('uq_surat_masuk_nomor_surat', 'nomor_surat', unique=True),
+        Index('ix_surat_masuk_tanggal_surat_id', 'tanggal_surat', 'id'),
+        Index('ix_surat_masuk_divisi_tanggal_surat_id', 'divisi', 'tanggal_surat', 'id'),
+        Index('ix_surat_masuk_inserted_at', 'inserted_at'),
+        Index('ix_surat_masuk_divisi_inserted_at', 'divisi', 'inserted_at'),
+        Index('ix_surat_masuk_inserted_by_id', 'inserted_by_id'),
+        Index(
+            'ix_surat_masuk_nomor_surat_trgm', 'nomor_surat',
+            postgresql_using='gin', postgresql_ops={'nomor_surat': 'gin_trgm_ops'}
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     nomor_surat = Column(String, nullable=False)
@@ -57,16 +67,34 @@ class SuratMasuk(Base):
     divisi = Column(Enum(DivisiEnum), nullable=False)
     keterangan = Column(String, nullable=True)
     file_path = Column(String, nullable=False)
+    # Blob di src/utils/file_storage_helper.py; NULL untuk file lama sebelum storage berbasis hash
+    file_hash = Column(String(64), ForeignKey("file_blobs.sha256"), nullable=True)
+    file_name = Column(String, nullable=True)
     inserted_at = Column(DateTime, nullable=False)
     inserted_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    dibaca_oleh_id = Column(ARRAY(Integer), nullable=True)
+    # Read receipt (user yang sudah membuka surat); respons hanya memuat jumlahnya
+    dibaca_oleh_id = deferred(Column(ARRAY(Integer), nullable=True))
+    # Dijaga oleh src/utils/search_helper.py, tidak perlu diisi manual
+    search_vector = deferred(Column(SearchVector, nullable=True))
 
     # Relationships
     inserted_by = relationship("User", foreign_keys=[inserted_by_id], backref="surat_masuk_inserted")
-    dibaca_oleh = relationship("User", secondary=surat_masuk_dibaca_oleh, back_populates="surat_masuk_dibaca")
 
 class SuratKeluar(Base):
     __tablename__ = "surat_keluar"
+    __table_args__ = (
+        Index('ix_surat_keluar_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('uq_surat_keluar_nomor_surat', 'nomor_surat', unique=True),
+        Index('ix_surat_keluar_tanggal_surat_id', 'tanggal_surat', 'id'),
+        Index('ix_surat_keluar_divisi_tanggal_surat_id', 'divisi', 'tanggal_surat', 'id'),
+        Index('ix_surat_keluar_inserted_at', 'inserted_at'),
+        Index('ix_surat_keluar_divisi_inserted_at', 'divisi', 'inserted_at'),
+        Index('ix_surat_keluar_inserted_by_id', 'inserted_by_id'),
+        Index(
+            'ix_surat_keluar_nomor_surat_trgm', 'nomor_surat',
+            postgresql_using='gin', postgresql_ops={'nomor_surat': 'gin_trgm_ops'}
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nomor_surat = Column(String, nullable=False)
@@ -77,13 +105,70 @@ class SuratKeluar(Base):
     divisi = Column(Enum(DivisiEnum), nullable=False)
     keterangan = Column(String)
     file_path = Column(String, nullable=False)
+    # Blob di src/utils/file_storage_helper.py; NULL untuk file lama sebelum storage berbasis hash
+    file_hash = Column(String(64), ForeignKey("file_blobs.sha256"), nullable=True)
+    file_name = Column(String, nullable=True)
     inserted_by_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     inserted_at = Column(DateTime, default=datetime.utcnow)
-    dibaca_oleh_id = Column(ARRAY(Integer), nullable=True)
+    # Read receipt (user yang sudah membuka surat); respons hanya memuat jumlahnya
+    dibaca_oleh_id = deferred(Column(ARRAY(Integer), nullable=True))
+    # Dijaga oleh src/utils/search_helper.py, tidak perlu diisi manual
+    search_vector = deferred(Column(SearchVector, nullable=True))
 
     # Relationships
     inserted_by = relationship("User", foreign_keys=[inserted_by_id], backref="surat_keluar_inserted")
-    dibaca_oleh = relationship("User", secondary=surat_keluar_dibaca_oleh, back_populates="surat_keluar_dibaca")
+
+class UnreadCounter(Base):
+    """
+    Jumlah surat belum dibaca per user dan per tipe surat ('surat_masuk' /
+    'surat_keluar'). Diperbarui secara inkremental oleh NotificationService.
+    """
+    __tablename__ = "unread_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    surat_type = Column(String, primary_key=True)
+    unread_count = Column(Integer, nullable=False, default=0)
+
+class ReadWatermark(Base):
+    """
+    Status baca per user dan per tipe surat: semua surat dengan inserted_at <=
+    read_through dianggap sudah dibaca. Surat di atas watermark yang sudah
+    dibaca dicatat di ReadException.
+    """
+    __tablename__ = "read_watermarks"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    surat_type = Column(String, primary_key=True)
+    read_through = Column(DateTime, nullable=False)
+
+class ReadException(Base):
+    """
+    Surat di atas watermark user yang sudah dibaca. Dirapikan (dihapus) saat
+    watermark maju melewatinya, sehingga tabel ini tetap kecil.
+    """
+    __tablename__ = "read_exceptions"
+    __table_args__ = (
+        Index('ix_read_exceptions_surat', 'surat_type', 'surat_id'),
+    )
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    surat_type = Column(String, primary_key=True)
+    surat_id = Column(Integer, primary_key=True)
+
+class NomorSuratRegistry(Base):
+    """
+    Nomor surat yang sudah dipakai, gabungan surat masuk dan surat keluar.
+    Primary key nomor_surat menjamin nomor unik di kedua tabel; dijaga oleh
+    src/utils/nomor_surat_helper.py di transaksi yang sama dengan suratnya.
+    """
+    __tablename__ = "nomor_surat_registry"
+    __table_args__ = (
+        Index('uq_nomor_surat_registry_surat', 'surat_type', 'surat_id', unique=True),
+    )
+
+    nomor_surat = Column(String, primary_key=True)
+    surat_type = Column(String, nullable=False)
+    surat_id = Column(Integer, nullable=False)
 
 class TemplateSurat(Base):
     __tablename__ = "template_surat"
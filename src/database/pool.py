@@ -0,0 +1,146 @@
+import bisect
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import DisconnectionError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, NullPool
+
+
+class PoolMetrics:
+    """
+    Statistik checkout koneksi satu pool: jumlah koneksi yang sedang dipakai,
+    total/maksimum waktu tunggu, timeout, dan histogram latensi checkout.
+    """
+    # Batas atas bucket histogram (milidetik); bucket terakhir untuk sisanya
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.histogram = [0] * (len(self.BUCKETS_MS) + 1)
+
+    def record_checkout(self, seconds, timed_out=False):
+        with self._lock:
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self.histogram[bisect.bisect_left(self.BUCKETS_MS, seconds * 1000)] += 1
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.in_use += 1
+
+    def record_return(self):
+        with self._lock:
+            self.in_use -= 1
+
+    def snapshot(self):
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checked_out": self.in_use,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.total_wait, 6),
+                "wait_seconds_avg": round(self.total_wait / attempts, 6) if attempts else 0.0,
+                "wait_seconds_max": round(self.max_wait, 6),
+                # le_ms None untuk bucket terakhir (di atas batas tertinggi)
+                "latency_histogram": [
+                    {"le_ms": bound, "count": count}
+                    for bound, count in zip(self.BUCKETS_MS + (None,), self.histogram)
+                ]
+            }
+
+
+class InstrumentedPoolMixin:
+    """
+    Mengukur lama `_do_get`, yaitu waktu menunggu koneksi kosong atau membuka
+    koneksi baru, untuk setiap checkout dari pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start)
+        return connection
+
+    def _do_return_conn(self, record):
+        self.metrics.record_return()
+        super()._do_return_conn(record)
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedNullPool(InstrumentedPoolMixin, NullPool):
+    pass
+
+
+def install_idle_pre_ping(engine, idle_seconds):
+    """
+    Ping koneksi saat checkout hanya jika koneksi sudah idle di pool lebih lama
+    dari `idle_seconds`, menggantikan pool_pre_ping yang menambah satu round
+    trip di setiap checkout. Koneksi yang gagal di-ping dibuang dan diganti.
+    `idle_seconds` negatif mematikan ping.
+    """
+    if idle_seconds < 0:
+        return
+
+    @event.listens_for(engine, 'checkin')
+    def mark_idle(dbapi_connection, connection_record):
+        if dbapi_connection is not None:
+            connection_record.info['checked_in_at'] = time.monotonic()
+
+    @event.listens_for(engine, 'checkout')
+    def ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get('checked_in_at')
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+
+        try:
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+        except Exception:
+            # Pool akan membuang koneksi ini dan mencoba koneksi baru
+            raise DisconnectionError("Idle connection failed pre-ping")
+
+
+def pool_stats(pool):
+    """
+    Statistik pool proses ini (setiap worker punya pool sendiri).
+    """
+    stats = {
+        "pid": os.getpid(),
+        "pool_class": type(pool).__name__,
+        "status": pool.status()
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout()
+        })
+
+    metrics = getattr(pool, 'metrics', None)
+    if metrics is not None:
+        stats.update(metrics.snapshot())
+    return stats
@@ -0,0 +1,45 @@
+import itertools
+import threading
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+
+class ReplicaSet:
+    """
+    Daftar engine read replica yang dipilih bergiliran (round-robin).
+    """
+
+    def __init__(self, engines):
+        self.engines = list(engines)
+        self._cycle = itertools.cycle(self.engines)
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.engines)
+
+    def next(self):
+        with self._lock:
+            return next(self._cycle)
+
+
+class RoutingSession(Session):
+    """
+    Session yang membaca dari read replica jika `info['use_replica']` diaktifkan,
+    dan selalu menulis ke primary (bind session). Satu session memakai satu
+    replica yang sama selama hidupnya. Begitu session menulis, query berikutnya
+    juga dibaca dari primary supaya hasil tulisannya terlihat.
+    """
+
+    def __init__(self, *args, replicas=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get('use_replica') and self.replicas:
+            if self._flushing or isinstance(clause, UpdateBase):
+                self.info['use_replica'] = False
+            else:
+                if 'replica' not in self.info:
+                    self.info['replica'] = self.replicas.next()
+                return self.info['replica']
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
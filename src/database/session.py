@@ -0,0 +1,171 @@
+import logging
+from contextlib import contextmanager
+from flask import g, jsonify, request, has_request_context
+from itsdangerous import TimestampSigner, BadSignature
+from src.database.config import SessionLocal, DATABASE_REPLICA_URLS, REPLICA_RYW_SECONDS, JWT_SECRET_KEY
+from src.utils.cache_helper import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Session database per request (unit of work). Service dan decorator auth memakai
+# session yang sama lewat get_db(); commit/rollback dilakukan sekali di akhir
+# request, sehingga satu request hanya memakai satu koneksi dari pool.
+
+# Blueprint yang request GET-nya boleh dibaca dari read replica
+READ_REPLICA_BLUEPRINTS = {'surat_masuk', 'surat_keluar', 'user', 'dashboard', 'notifications'}
+
+# User yang baru saja menulis; request mereka dibaca dari primary sampai entri
+# kedaluwarsa (read-your-writes). Cache ini hanya berlaku di proses worker yang
+# menangani write, jadi response write juga membawa penanda bertanda tangan
+# (cookie dan header X-Last-Write) yang dikirim ulang client ke worker mana pun.
+recent_writers = TTLCache(ttl=REPLICA_RYW_SECONDS)
+
+LAST_WRITE_COOKIE = 'kpu_last_write'
+LAST_WRITE_HEADER = 'X-Last-Write'
+last_write_signer = TimestampSigner(JWT_SECRET_KEY, salt='read-your-writes')
+
+
+def _wrote_recently(user_id):
+    if recent_writers.get(user_id) is not None:
+        return True
+    marker = request.headers.get(LAST_WRITE_HEADER) or request.cookies.get(LAST_WRITE_COOKIE)
+    if not marker:
+        return False
+    try:
+        # Timestamp ikut ditandatangani; penanda lebih tua dari REPLICA_RYW_SECONDS ditolak
+        signed_user_id = last_write_signer.unsign(marker, max_age=REPLICA_RYW_SECONDS)
+    except BadSignature:
+        return False
+    return signed_user_id == str(user_id).encode()
+
+
+def _mark_last_write(response, user_id):
+    recent_writers.set(user_id, True)
+    if not DATABASE_REPLICA_URLS:
+        return
+    marker = last_write_signer.sign(str(user_id)).decode('ascii')
+    response.headers[LAST_WRITE_HEADER] = marker
+    response.set_cookie(LAST_WRITE_COOKIE, marker, max_age=REPLICA_RYW_SECONDS, httponly=True, samesite='Lax')
+
+
+def _use_replica():
+    if not DATABASE_REPLICA_URLS or not has_request_context():
+        return False
+    if request.method != 'GET' or request.blueprint not in READ_REPLICA_BLUEPRINTS:
+        return False
+    user_id = g.get('current_user_id')
+    return user_id is None or not _wrote_recently(user_id)
+
+
+def get_db():
+    """
+    Session milik request yang sedang berjalan, dibuka saat pertama kali dipakai.
+    Service cukup melakukan flush; jangan commit atau close session ini.
+
+    Di luar application context (script, thread latar belakang) gunakan
+    SessionLocal secara langsung.
+    """
+    if 'db' not in g:
+        g.db = SessionLocal()
+        g.db.info['use_replica'] = _use_replica()
+        g.db_callbacks = []
+        g.db_rollback_callbacks = []
+    return g.db
+
+
+@contextmanager
+def stream_db():
+    """
+    Session tersendiri untuk body response streaming (mis. export). Session
+    request sudah di-commit dan ditutup sebelum body dikirim, jadi generator
+    membuka session sendiri yang ditutup saat stream selesai atau terputus.
+    Hanya untuk membaca; replica dipakai dengan aturan yang sama seperti get_db().
+    """
+    db = SessionLocal()
+    db.info['use_replica'] = _use_replica()
+    try:
+        yield db
+    finally:
+        db.rollback()
+        db.close()
+
+
+def use_primary():
+    """
+    Baca sisa request ini dari primary, mis. untuk data yang akan disimpan lama
+    di cache sehingga tidak boleh tertinggal dari replica.
+    """
+    get_db().info['use_replica'] = False
+
+
+def on_commit(callback):
+    """
+    Jalankan `callback` setelah transaksi request berhasil di-commit, mis. untuk
+    invalidasi cache atau mengirim event. Tidak dijalankan jika request di-rollback.
+    """
+    get_db()
+    g.db_callbacks.append(callback)
+
+
+def on_rollback(callback):
+    """
+    Jalankan `callback` jika transaksi request tidak jadi di-commit (response
+    error, commit gagal, atau exception), mis. untuk membersihkan file yang
+    sudah ditulis ke disk. Tidak dijalankan jika commit berhasil.
+    """
+    get_db()
+    g.db_rollback_callbacks.append(callback)
+
+
+def _run_callbacks(callbacks):
+    for callback in callbacks:
+        try:
+            callback()
+        except Exception:
+            logger.exception("After-commit callback failed")
+
+
+def init_app(app):
+    @app.after_request
+    def commit_db(response):
+        # Dijalankan sebelum body response dikirim, jadi koneksi sudah kembali
+        # ke pool sebelum response streaming (mis. SSE) dimulai
+        db = g.pop('db', None)
+        callbacks = g.pop('db_callbacks', [])
+        rollback_callbacks = g.pop('db_rollback_callbacks', [])
+        if db is None:
+            return response
+
+        try:
+            if response.status_code < 400:
+                db.commit()
+                user_id = g.get('current_user_id')
+                if request.method != 'GET' and user_id is not None:
+                    _mark_last_write(response, user_id)
+            else:
+                db.rollback()
+                callbacks = rollback_callbacks
+        except Exception as e:
+            db.rollback()
+            response = jsonify({
+                'status': 'error',
+                'message': str(e)
+            })
+            response.status_code = 500
+            callbacks = rollback_callbacks
+        finally:
+            db.close()
+
+        _run_callbacks(callbacks)
+        return response
+
+    @app.teardown_appcontext
+    def close_db(exception=None):
+        # Request gagal sebelum after_request (exception tidak tertangani)
+        db = g.pop('db', None)
+        g.pop('db_callbacks', None)
+        rollback_callbacks = g.pop('db_rollback_callbacks', [])
+        if db is not None:
+            db.rollback()
+            db.close()
+            _run_callbacks(rollback_callbacks)
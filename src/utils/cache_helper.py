@@ -0,0 +1,70 @@
+import threading
+import time
+
+
+class TTLCache:
+    """
+    Cache sederhana di memori proses dengan masa berlaku (TTL) per entri.
+
+    Aman dipakai dari beberapa thread sekaligus. Setiap invalidasi menaikkan
+    nomor generasi, sehingga hasil query yang dimulai sebelum invalidasi tidak
+    akan menimpa cache dengan data lama (lihat parameter `generation` di `set`).
+    """
+
+    def __init__(self, ttl, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl=None, generation=None):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            # Lewati jika cache sudah diinvalidasi sejak nilai ini mulai dihitung
+            if generation is not None and generation != self._generation:
+                return
+
+            if key not in self._data and len(self._data) >= self.max_size:
+                self._prune()
+            self._data[key] = (value, time.monotonic() + ttl)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def _prune(self):
+        now = time.monotonic()
+        expired = [key for key, (_, expires_at) in self._data.items() if expires_at < now]
+        for key in expired:
+            del self._data[key]
+
+        # Jika masih penuh, buang entri yang paling cepat kedaluwarsa
+        if len(self._data) >= self.max_size:
+            oldest = min(self._data, key=lambda k: self._data[k][1])
+            del self._data[oldest]
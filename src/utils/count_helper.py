@@ -0,0 +1,98 @@
+import json
+import threading
+from src.database.config import COUNT_CACHE_TTL
+from src.utils.cache_helper import TTLCache
+from src.utils.event_bus import event_bus
+
+COUNT_MODES = ('exact', 'estimate', 'none')
+COUNT_INVALIDATED = 'count_invalidated'
+
+
+def filter_fingerprint(search=None, start_date=None, end_date=None, divisi=None):
+    """
+    Normalisasi filter list menjadi string, sehingga filter yang ekuivalen
+    (mis. beda huruf besar/kecil pada search) memakai entri cache yang sama.
+    """
+    return json.dumps([
+        search.strip().lower() if search else None,
+        start_date.isoformat() if start_date else None,
+        end_date.isoformat() if end_date else None,
+        divisi or None
+    ], separators=(',', ':'))
+
+
+class CountCache:
+    """
+    Cache jumlah total hasil filter per tabel. Setiap tabel punya nomor versi
+    yang dinaikkan oleh operasi tulis, sehingga semua entri lama tabel itu
+    langsung tidak terpakai lagi. Kenaikan versi disebarkan ke worker lain lewat
+    event bus (EVENT_BUS_BACKEND=postgres untuk deployment multi-worker).
+    """
+
+    def __init__(self, ttl):
+        self._cache = TTLCache(ttl=ttl)
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get_or_count(self, table, fingerprint, count_fn):
+        # Mulai menerima invalidasi dari worker lain sebelum total pertama di-cache
+        event_bus.add_listener(self._on_event)
+        version = self._versions.get(table, 0)
+        key = (table, version, fingerprint)
+
+        total = self._cache.get(key)
+        if total is None:
+            total = count_fn()
+            self._cache.set(key, total)
+        return total
+
+    def _bump(self, table):
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+
+    def _on_event(self, event):
+        if event.get('type') == COUNT_INVALIDATED:
+            self._bump(event['table'])
+
+    def invalidate(self, table):
+        """
+        Dipanggil setelah commit operasi tulis pada `table`.
+        """
+        self._bump(table)
+        event_bus.publish({"type": COUNT_INVALIDATED, "table": table})
+
+
+count_cache = CountCache(ttl=COUNT_CACHE_TTL)
+
+
+def estimate_count(db, query):
+    """
+    Perkiraan jumlah baris dari statistik planner Postgres (EXPLAIN), tanpa
+    menjalankan query. Mengembalikan None jika database bukan Postgres.
+    """
+    bind = db.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return None
+
+    compiled = query.statement.compile(dialect=bind.dialect)
+    plan = db.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_total(db, query, table, fingerprint, count_mode='exact'):
+    """
+    Hitung total baris sesuai mode count.
+
+    Returns:
+        tuple: (total, is_estimate)
+    """
+    if count_mode == 'estimate':
+        total = estimate_count(db, query)
+        if total is not None:
+            return total, True
+
+    return count_cache.get_or_count(table, fingerprint, query.count), False
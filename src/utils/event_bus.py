@@ -0,0 +1,178 @@
+import json
+import logging
+import queue
+import select
+import threading
+import time
+from sqlalchemy import text
+from src.database.config import engine, EVENT_BUS_BACKEND, EVENT_BUS_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    Antrian event untuk satu pelanggan (mis. satu koneksi SSE). Event yang
+    tidak lolos `predicate` tidak pernah masuk antrian.
+    """
+
+    def __init__(self, bus, predicate=None, max_queue=100):
+        self.bus = bus
+        self.predicate = predicate
+        self._queue = queue.Queue(maxsize=max_queue)
+
+    def offer(self, event):
+        if self.predicate and not self.predicate(event):
+            return
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # Pelanggan yang lambat kehilangan event lama, bukan memblokir publisher
+            logger.warning("Event subscriber queue full, dropping event")
+
+    def get(self, timeout=None):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class InMemoryBackend:
+    """
+    Backend untuk satu proses saja: event langsung diteruskan ke pelanggan
+    lokal. Cocok untuk development dan deployment satu worker.
+    """
+
+    def start(self, dispatch):
+        self._dispatch = dispatch
+
+    def publish(self, event):
+        self._dispatch(event)
+
+
+class PostgresBackend:
+    """
+    Backend berbasis Postgres LISTEN/NOTIFY sehingga event dari satu worker
+    sampai ke pelanggan di semua worker. Setiap proses membuka satu koneksi
+    LISTEN khusus di thread latar belakang.
+    """
+
+    def __init__(self, engine, channel):
+        self.engine = engine
+        self.channel = channel
+
+    def start(self, dispatch):
+        self._dispatch = dispatch
+        thread = threading.Thread(target=self._listen_forever, name='event-bus-listener', daemon=True)
+        thread.start()
+
+    def publish(self, event):
+        # NOTIFY juga diterima oleh listener proses ini, jadi tidak perlu dispatch lokal
+        with self.engine.begin() as conn:
+            conn.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": self.channel, "payload": json.dumps(event)}
+            )
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except Exception:
+                logger.exception("Event bus listener disconnected, reconnecting")
+                time.sleep(5)
+
+    def _listen(self):
+        import psycopg2
+        import psycopg2.extensions
+
+        url = self.engine.url.set(drivername='postgresql').render_as_string(hide_password=False)
+        conn = psycopg2.connect(url)
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    self._dispatch(json.loads(notify.payload))
+        finally:
+            conn.close()
+
+
+class EventBus:
+    def __init__(self, backend):
+        self.backend = backend
+        self._subscribers = set()
+        self._listeners = set()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def _ensure_started(self):
+        # Backend baru dijalankan saat pertama kali dipakai, bukan saat import
+        with self._lock:
+            if not self._started:
+                self.backend.start(self._dispatch)
+                self._started = True
+
+    def subscribe(self, predicate=None, max_queue=100):
+        self._ensure_started()
+        subscription = Subscription(self, predicate, max_queue)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def add_listener(self, callback):
+        """
+        Panggil `callback(event)` untuk setiap event di proses ini, mis. untuk
+        invalidasi cache lokal dari write di worker lain. Dipanggil dari thread
+        listener, jadi callback harus cepat dan thread-safe.
+        """
+        self._ensure_started()
+        with self._lock:
+            self._listeners.add(callback)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event):
+        """
+        Kirim event ke semua pelanggan. Kegagalan hanya dicatat di log, karena
+        event dikirim setelah data tersimpan dan tidak boleh menggagalkan request.
+        """
+        try:
+            self._ensure_started()
+            self.backend.publish(event)
+        except Exception:
+            logger.exception("Failed to publish event")
+
+    def _dispatch(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("Event listener failed")
+        for subscription in subscribers:
+            subscription.offer(event)
+
+
+def create_backend(name):
+    if name == 'postgres':
+        return PostgresBackend(engine, EVENT_BUS_CHANNEL)
+    if name == 'memory':
+        return InMemoryBackend()
+    raise ValueError(f"Unknown event bus backend: {name}")
+
+
+event_bus = EventBus(create_backend(EVENT_BUS_BACKEND))
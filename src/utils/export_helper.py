@@ -0,0 +1,211 @@
+import csv
+import io
+import os
+import re
+from datetime import datetime
+from xml.sax.saxutils import escape
+from src.utils.zip_stream import ZipStream
+from src.utils.file_storage_helper import CHUNK_SIZE
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+# Baris yang dikumpulkan sebelum dikirim sebagai satu chunk response
+ROWS_PER_CHUNK = 500
+
+# Format yang isinya sudah terkompresi; disimpan apa adanya (STORED) di arsip
+COMPRESSED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png', '.zip', '.rar', '.docx', '.xlsx', '.pptx'}
+MISSING_FILES_NAME = 'FILE_TIDAK_DITEMUKAN.txt'
+
+# Awalan yang membuat teks dibaca sebagai formula oleh Excel/LibreOffice (CSV injection)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+# Karakter kontrol yang tidak boleh ada di XML (kecuali tab dan newline)
+_ILLEGAL_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def export_value(value):
+    """
+    Nilai sel export: tanggal tanpa jam jika jamnya kosong, enum sebagai nilainya.
+    """
+    if isinstance(value, datetime):
+        if value.hour == value.minute == value.second == 0:
+            return value.date().isoformat()
+        return value.isoformat(sep=' ', timespec='seconds')
+    return getattr(value, 'value', value)
+
+
+def _csv_value(value):
+    # Teks isian user yang diawali karakter formula diberi awalan ' supaya tetap
+    # dibaca sebagai teks saat CSV dibuka di spreadsheet. Tidak perlu di XLSX,
+    # karena inline string di sana tidak pernah dibaca sebagai formula.
+    value = export_value(value)
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(columns, rows):
+    """
+    Tulis baris menjadi CSV secara bertahap.
+
+    Args:
+        columns (list): Nama kolom, juga urutan nilai di setiap baris
+        rows (iterable): Baris (Row/tuple) sesuai urutan `columns`
+
+    Yields:
+        str: Potongan CSV
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # BOM supaya Excel membaca file sebagai UTF-8
+    buffer.write('﻿')
+    writer.writerow(columns)
+
+    for index, row in enumerate(rows, 1):
+        writer.writerow([_csv_value(value) for value in row])
+        if index % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def _xlsx_cell(value):
+    value = export_value(value)
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_sheet(columns, rows):
+    yield (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<sheetData>'
+    ).encode('utf-8')
+
+    chunk = ['<row>', *(_xlsx_cell(column) for column in columns), '</row>']
+    for index, row in enumerate(rows, 1):
+        chunk.append('<row>')
+        chunk.extend(_xlsx_cell(value) for value in row)
+        chunk.append('</row>')
+        if index % ROWS_PER_CHUNK == 0:
+            yield ''.join(chunk).encode('utf-8')
+            chunk = []
+
+    chunk.append('</sheetData></worksheet>')
+    yield ''.join(chunk).encode('utf-8')
+
+
+def stream_xlsx(columns, rows, sheet_name='Sheet1'):
+    """
+    Tulis baris menjadi workbook XLSX (satu sheet) secara bertahap. Sel ditulis
+    sebagai inline string/angka sehingga tidak perlu shared strings yang harus
+    dikumpulkan di memori dulu.
+
+    Yields:
+        bytes: Potongan file XLSX
+    """
+    sheet_name = escape(sheet_name[:31])
+    parts = (
+        ('[Content_Types].xml',
+         '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+         '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+         '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+         '<Default Extension="xml" ContentType="application/xml"/>'
+         '<Override PartName="/xl/workbook.xml" '
+         'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+         '<Override PartName="/xl/worksheets/sheet1.xml" '
+         'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+         '</Types>'),
+        ('_rels/.rels',
+         '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+         '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+         '<Relationship Id="rId1" '
+         'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+         'Target="xl/workbook.xml"/>'
+         '</Relationships>'),
+        ('xl/workbook.xml',
+         '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+         '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+         'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+         f'<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+         '</workbook>'),
+        ('xl/_rels/workbook.xml.rels',
+         '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+         '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+         '<Relationship Id="rId1" '
+         'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+         'Target="worksheets/sheet1.xml"/>'
+         '</Relationships>'),
+    )
+
+    archive = ZipStream()
+    for name, content in parts:
+        yield from archive.add(name, [content.encode('utf-8')])
+    yield from archive.add('xl/worksheets/sheet1.xml', _xlsx_sheet(columns, rows))
+    yield from archive.finish()
+
+
+def _read_chunks(path):
+    with open(path, 'rb') as stream:
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _archive_name(name, used_names):
+    # Nama entry unik (tanpa membedakan huruf besar/kecil): "scan.pdf", "scan (2).pdf", ...
+    name = name.replace('/', '_').replace('\\', '_').strip() or 'file'
+    stem, extension = os.path.splitext(name)
+    candidate, number = name, 1
+    while candidate.lower() in used_names:
+        number += 1
+        candidate = f"{stem} ({number}){extension}"
+    used_names.add(candidate.lower())
+    return candidate
+
+
+def stream_file_archive(rows):
+    """
+    Kumpulkan file surat menjadi satu arsip ZIP yang dikirim bertahap. File
+    dibaca per potongan dan tidak ada file sementara, jadi memori tetap kecil
+    berapa pun jumlah dan ukuran filenya. Surat yang filenya tidak ada di disk
+    dicatat di FILE_TIDAK_DITEMUKAN.txt.
+
+    Args:
+        rows (iterable): Baris dengan atribut nomor_surat, file_path, dan file_name
+
+    Yields:
+        bytes: Potongan arsip ZIP
+    """
+    archive = ZipStream()
+    used_names = {MISSING_FILES_NAME.lower()}
+    missing = []
+
+    for row in rows:
+        if not row.file_path or not os.path.isfile(row.file_path):
+            missing.append(row.nomor_surat)
+            continue
+
+        name = _archive_name(row.file_name or os.path.basename(row.file_path), used_names)
+        stat = os.stat(row.file_path)
+        yield from archive.add(
+            name,
+            _read_chunks(row.file_path),
+            size=stat.st_size,
+            compress=os.path.splitext(name)[1].lower() not in COMPRESSED_EXTENSIONS,
+            modified=stat.st_mtime
+        )
+
+    if missing:
+        yield from archive.add(MISSING_FILES_NAME, ['\n'.join(missing).encode('utf-8')])
+    yield from archive.finish()
@@ -0,0 +1,83 @@
+import mimetypes
+import os
+import unicodedata
+from urllib.parse import quote
+from flask import Response, send_file
+from src.database.config import FILE_STORAGE_ROOT, FILE_OFFLOAD, FILE_ACCEL_PREFIX
+
+FILE_OFFLOAD_MODES = ('', 'x-accel', 'x-sendfile')
+if FILE_OFFLOAD not in FILE_OFFLOAD_MODES:
+    raise ValueError(f"Unknown FILE_OFFLOAD: {FILE_OFFLOAD}")
+
+
+def _content_disposition(download_name):
+    # Sama seperti send_file: nama ASCII untuk client lama, filename* untuk nama unicode
+    try:
+        download_name.encode('ascii')
+        return f'attachment; filename="{download_name}"'
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', download_name).encode('ascii', 'ignore').decode('ascii')
+        return f'attachment; filename="{simple}"; filename*=UTF-8\'\'{quote(download_name, safe="!#$&+^`|~")}'
+
+
+def _offload(path, download_name):
+    """
+    Response kosong yang menyuruh reverse proxy mengirim isi file. Proxy juga
+    menangani Range, If-Modified-Since, dan ETag file tersebut.
+    """
+    absolute_path = os.path.abspath(path)
+    if FILE_OFFLOAD == 'x-accel':
+        relative_path = os.path.relpath(absolute_path, os.path.abspath(FILE_STORAGE_ROOT))
+        if relative_path.startswith('..'):
+            # File lama di luar FILE_STORAGE_ROOT tidak bisa dipetakan ke location nginx
+            return None
+        header, value = 'X-Accel-Redirect', FILE_ACCEL_PREFIX.rstrip('/') + '/' + quote(relative_path)
+    else:
+        header, value = 'X-Sendfile', absolute_path
+
+    response = Response(mimetype=mimetypes.guess_type(download_name)[0] or 'application/octet-stream')
+    response.headers[header] = value
+    response.headers['Content-Disposition'] = _content_disposition(download_name)
+    return response
+
+
+def send_stored_file(path, download_name=None, etag=None, max_age=None, public=False):
+    """
+    Kirim file upload sebagai attachment dengan dukungan conditional GET
+    (ETag/Last-Modified, 304) dan HTTP Range, atau serahkan ke reverse proxy
+    jika FILE_OFFLOAD diaktifkan.
+
+    Args:
+        path (str): Path file di disk
+        download_name (str, optional): Nama file untuk user, default nama file di disk
+        etag (str, optional): ETag kuat, mis. hash isi file. Tanpa etag, ETag
+            dibuat dari waktu modifikasi dan ukuran file
+        max_age (int, optional): Lama (detik) response boleh di-cache
+        public (bool): Boleh di-cache proxy bersama; default hanya cache browser user
+
+    Returns:
+        Response, atau None jika file tidak ada di disk
+    """
+    if not os.path.isfile(path):
+        return None
+    download_name = download_name or os.path.basename(path)
+
+    response = _offload(path, download_name) if FILE_OFFLOAD else None
+    if response is not None:
+        if max_age:
+            response.cache_control.public = True
+            response.cache_control.max_age = max_age
+    else:
+        response = send_file(
+            path,
+            as_attachment=True,
+            download_name=download_name,
+            conditional=True,
+            etag=etag or True,
+            max_age=max_age
+        )
+
+    if not public:
+        response.cache_control.public = None
+        response.cache_control.private = True
+    return response
@@ -0,0 +1,122 @@
+import hashlib
+import os
+import tempfile
+from datetime import datetime
+from functools import partial
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.dialects.postgresql import insert
+from src.database.config import engine, FILE_STORAGE_ROOT
+from src.database.models import FileBlob
+from flask import has_app_context
+from src.database.session import on_commit, on_rollback
+
+# Ukuran potongan saat upload dibaca, di-hash, dan ditulis ke disk
+CHUNK_SIZE = 64 * 1024
+
+# File upload disimpan sekali per isi di FILE_STORAGE_ROOT/ab/cd/<sha256>.
+# Baris FileBlob mencatat berapa surat yang memakai file itu. Penambahan
+# referensi dan penghapusan file dikunci per hash (advisory lock Postgres),
+# sehingga file tidak terhapus saat ada upload isi yang sama bersamaan.
+
+
+def blob_path(sha256):
+    return os.path.join(FILE_STORAGE_ROOT, sha256[:2], sha256[2:4], sha256)
+
+
+def _lock_blob(connection, sha256):
+    # Dilepas otomatis saat transaksi selesai
+    connection.execute(select(func.pg_advisory_xact_lock(func.hashtextextended(sha256, 0))))
+
+
+def store_upload(db, file):
+    """
+    Simpan file upload (werkzeug FileStorage) ke storage dan tambah satu
+    referensi di transaksi `db`. Isi di-hash sambil ditulis ke file sementara,
+    jadi file dibaca sekali dan tidak pernah dimuat utuh ke memori.
+
+    Di dalam request, blob dibersihkan otomatis jika transaksi request tidak
+    di-commit. Di luar request (script), pemanggil harus memanggil
+    collect_blob(sha256) sendiri jika transaksinya gagal.
+
+    Returns:
+        tuple: (sha256, path)
+    """
+    tmp_dir = os.path.join(FILE_STORAGE_ROOT, 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        digest = hashlib.sha256()
+        size = 0
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = file.stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+
+        sha256 = digest.hexdigest()
+        _lock_blob(db, sha256)
+        statement = insert(FileBlob).values(
+            sha256=sha256, size=size, ref_count=1, created_at=datetime.now()
+        )
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[FileBlob.sha256],
+            set_={'ref_count': FileBlob.ref_count + 1}
+        ))
+
+        # Isi file dengan hash yang sama identik, jadi menimpa blob yang sudah ada aman
+        path = blob_path(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        if has_app_context():
+            on_rollback(partial(collect_blob, sha256))
+        return sha256, path
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def release_blob(db, sha256):
+    """
+    Kurangi satu referensi; file dihapus setelah commit jika tidak dipakai lagi.
+    """
+    ref_count = db.execute(
+        update(FileBlob)
+        .where(FileBlob.sha256 == sha256)
+        .values(ref_count=FileBlob.ref_count - 1)
+        .returning(FileBlob.ref_count)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if ref_count is not None and ref_count <= 0:
+        on_commit(partial(collect_blob, sha256))
+
+
+def release_surat_file(db, surat):
+    # File surat lama (sebelum storage berbasis hash) hanya dipakai surat itu sendiri
+    if surat.file_hash:
+        release_blob(db, surat.file_hash)
+    elif surat.file_path:
+        on_commit(partial(_remove_file, surat.file_path))
+
+
+def collect_blob(sha256):
+    """
+    Hapus blob yang tidak lagi direferensikan (atau tidak tercatat sama sekali,
+    mis. upload yang transaksinya gagal). Aman dipanggil berulang kali.
+    """
+    with engine.begin() as conn:
+        _lock_blob(conn, sha256)
+        ref_count = conn.scalar(select(FileBlob.ref_count).where(FileBlob.sha256 == sha256))
+        if ref_count is not None and ref_count > 0:
+            return
+        conn.execute(delete(FileBlob).where(FileBlob.sha256 == sha256))
+        _remove_file(blob_path(sha256))
+
+
+def _remove_file(path):
+    if os.path.exists(path):
+        os.remove(path)
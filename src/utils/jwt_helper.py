@@ -1,10 +1,27 @@
 import jwt
+from collections import namedtuple
 from datetime import datetime, timedelta
-from flask import request, jsonify
+from flask import request, jsonify, g
 from functools import wraps
-from src.database.config import JWT_SECRET_KEY, JWT_ALGORITHM
+from src.database.config import JWT_SECRET_KEY, JWT_ALGORITHM, PRINCIPAL_CACHE_TTL
 from src.database.models import User, RoleEnum
-from src.database.config import SessionLocal
+from src.database.session import get_db
+from src.utils.cache_helper import TTLCache
+from src.utils.event_bus import event_bus
+from src.utils.query_stats_helper import timed
+
+# Snapshot user yang login. Tidak terikat ke session SQLAlchemy mana pun,
+# sehingga aman dibagikan antar request dan thread lewat cache. Hash password
+# sengaja tidak ikut disimpan; proses ganti password memuat baris User sendiri.
+Principal = namedtuple('Principal', ['id', 'username', 'nama_lengkap', 'role', 'divisi'])
+
+principal_cache = TTLCache(ttl=PRINCIPAL_CACHE_TTL)
+PRINCIPAL_INVALIDATED = 'principal_invalidated'
+
+
+def _on_event(event):
+    if event.get('type') == PRINCIPAL_INVALIDATED:
+        principal_cache.invalidate(event['user_id'])
 
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(days=1)):
     to_encode = data.copy()
@@ -22,38 +39,69 @@ def decode_access_token(token: str):
     except jwt.InvalidTokenError:
         return None
 
+def load_principal(user_id):
+    """
+    Ambil data user yang login dari cache, atau dari database jika belum ada.
+    """
+    # Mulai menerima invalidasi dari worker lain sebelum principal pertama di-cache
+    event_bus.add_listener(_on_event)
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    generation = principal_cache.generation
+    user = get_db().query(User).filter(User.id == user_id).first()
+    if not user:
+        return None
+
+    principal = Principal(
+        id=user.id,
+        username=user.username,
+        nama_lengkap=user.nama_lengkap,
+        role=user.role,
+        divisi=user.divisi
+    )
+
+    principal_cache.set(user_id, principal, generation=generation)
+    return principal
+
+def invalidate_principal(user_id):
+    """
+    Hapus user dari cache, di proses ini dan (lewat event bus) di worker lain.
+    Dipanggil setiap kali data user berubah atau dihapus.
+    """
+    principal_cache.invalidate(user_id)
+    event_bus.publish({"type": PRINCIPAL_INVALIDATED, "user_id": user_id})
+
 def login_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         token = None
-        db = None
         try:
-            if 'Authorization' in request.headers:
-                bearer = request.headers['Authorization']
-                token = bearer.split()[1] if bearer.startswith('Bearer ') else bearer
+            with timed('auth'):
+                if 'Authorization' in request.headers:
+                    bearer = request.headers['Authorization']
+                    token = bearer.split()[1] if bearer.startswith('Bearer ') else bearer
 
-            if not token:
-                return jsonify({"message": "Missing token"}), 401
+                if not token:
+                    return jsonify({"message": "Missing token"}), 401
 
-            data = decode_access_token(token)
-            if not data:
-                return jsonify({"message": "Invalid or expired token"}), 401
+                data = decode_access_token(token)
+                if not data:
+                    return jsonify({"message": "Invalid or expired token"}), 401
 
-            db = SessionLocal()
-            user = db.query(User).filter(User.id == data["user_id"]).first()
+                # Dipakai get_db() untuk memilih replica/primary sebelum user dimuat
+                g.current_user_id = data["user_id"]
+                user = load_principal(data["user_id"])
 
-            if not user:
-                return jsonify({"message": "User not found"}), 404
+                if not user:
+                    return jsonify({"message": "User not found"}), 404
 
             request.current_user = user
             return f(*args, **kwargs)
             
         except Exception as e:
             return jsonify({"message": f"An error occurred: {str(e)}"}), 500
-            
-        finally:
-            if db:
-                db.close()
                 
     return decorated
 
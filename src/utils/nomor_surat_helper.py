@@ -0,0 +1,74 @@
+from sqlalchemy import select, insert, update, delete
+from src.database.models import NomorSuratRegistry
+
+# Constraint yang menolak nomor surat ganda: primary key registry (nama default
+# Postgres, migrasi 58a01c7cf62b) dan index unik per tabel (migrasi cae5bf2d7435)
+NOMOR_SURAT_CONSTRAINTS = frozenset({
+    'nomor_surat_registry_pkey',
+    'uq_surat_masuk_nomor_surat',
+    'uq_surat_keluar_nomor_surat',
+})
+UNIQUE_VIOLATION = '23505'
+
+SURAT_LABELS = {
+    'surat_masuk': 'surat masuk',
+    'surat_keluar': 'surat keluar',
+}
+
+
+def register_nomor_surat(db, surat_type, surat_id, nomor_surat):
+    """
+    Catat nomor surat baru di registry. Nomor yang sudah dipakai (di surat
+    masuk maupun keluar) memicu IntegrityError saat statement dijalankan;
+    gunakan `duplicate_nomor_surat_message` untuk pesan error-nya.
+    """
+    db.execute(
+        insert(NomorSuratRegistry).values(
+            nomor_surat=nomor_surat, surat_type=surat_type, surat_id=surat_id
+        )
+    )
+
+
+def rename_nomor_surat(db, surat_type, surat_id, nomor_surat):
+    # Ganti nomor surat yang sudah terdaftar; bentrok juga berupa IntegrityError
+    result = db.execute(
+        update(NomorSuratRegistry)
+        .where(NomorSuratRegistry.surat_type == surat_type, NomorSuratRegistry.surat_id == surat_id)
+        .values(nomor_surat=nomor_surat)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        register_nomor_surat(db, surat_type, surat_id, nomor_surat)
+
+
+def unregister_nomor_surat(db, surat_type, surat_id):
+    db.execute(
+        delete(NomorSuratRegistry)
+        .where(NomorSuratRegistry.surat_type == surat_type, NomorSuratRegistry.surat_id == surat_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def duplicate_nomor_surat_message(db, surat_type, nomor_surat):
+    """
+    Pesan error untuk nomor surat yang bentrok. Dipanggil setelah rollback,
+    hanya saat constraint sudah menolak nomor tersebut.
+    """
+    owner = db.scalar(
+        select(NomorSuratRegistry.surat_type).where(NomorSuratRegistry.nomor_surat == nomor_surat)
+    )
+    if owner is None or owner == surat_type:
+        return f"Nomor surat '{nomor_surat}' sudah dimasukkan"
+    return f"Nomor surat '{nomor_surat}' sudah dimasukkan di {SURAT_LABELS[owner]}"
+
+
+def is_duplicate_nomor_surat(error):
+    """
+    Apakah IntegrityError adalah pelanggaran unik pada constraint nomor surat
+    (registry atau index unik nomor_surat di tabel surat), bukan constraint
+    lain seperti NOT NULL atau foreign key.
+    """
+    if getattr(error.orig, 'pgcode', None) != UNIQUE_VIOLATION:
+        return False
+    diag = getattr(error.orig, 'diag', None)
+    return getattr(diag, 'constraint_name', None) in NOMOR_SURAT_CONSTRAINTS
@@ -0,0 +1,158 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from sqlalchemy import tuple_
+
+
+def encode_token(values):
+    """
+    Ubah list nilai (JSON-serializable) menjadi token opaque yang aman untuk URL.
+    """
+    payload = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_token(token):
+    """
+    Kebalikan dari `encode_token`.
+
+    Raises:
+        ValueError: Jika token tidak valid
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError, binascii.Error):
+        raise ValueError("Cursor tidak valid")
+    if not isinstance(values, list):
+        raise ValueError("Cursor tidak valid")
+    return values
+
+
+def encode_cursor(sort_value, row_id, direction='next'):
+    """
+    Buat cursor opaque dari posisi baris (nilai kolom urutan, id).
+    """
+    return encode_token([sort_value.isoformat(), row_id, direction])
+
+
+def decode_cursor(cursor):
+    """
+    Baca cursor yang dibuat oleh `encode_cursor`.
+
+    Returns:
+        tuple: (sort_value, row_id, direction), atau None untuk halaman pertama
+
+    Raises:
+        ValueError: Jika cursor tidak valid
+    """
+    if not cursor:
+        return None
+
+    try:
+        sort_value, row_id, direction = decode_token(cursor)
+        if direction not in ('next', 'prev') or not isinstance(row_id, int):
+            raise ValueError
+        return datetime.fromisoformat(sort_value), row_id, direction
+    except (ValueError, TypeError):
+        raise ValueError("Cursor tidak valid")
+
+
+def paginate_keyset(query, sort_column, id_column, per_page, cursor=None):
+    """
+    Paginasi keyset (seek) dengan urutan (sort_column desc, id_column desc).
+
+    Posisi halaman dicari lewat klausa WHERE, bukan OFFSET, sehingga biaya
+    halaman terdalam sama dengan halaman pertama.
+
+    Args:
+        query: Query yang sudah difilter
+        sort_column: Kolom urutan utama (mis. SuratMasuk.tanggal_surat)
+        id_column: Kolom id sebagai pemecah nilai yang sama
+        per_page (int): Jumlah baris per halaman
+        cursor (str, optional): Cursor dari respons sebelumnya
+
+    Returns:
+        tuple: (rows, pagination)
+    """
+    position = decode_cursor(cursor)
+    direction = position[2] if position else 'next'
+
+    if position:
+        key = tuple_(sort_column, id_column)
+        if direction == 'next':
+            query = query.filter(key < tuple_(position[0], position[1]))
+        else:
+            query = query.filter(key > tuple_(position[0], position[1]))
+
+    if direction == 'next':
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    # Ambil satu baris ekstra untuk mengetahui apakah masih ada halaman berikutnya
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if direction == 'next':
+        has_next, has_prev = has_more, position is not None
+    else:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+
+    sort_key, id_key = sort_column.key, id_column.key
+    next_cursor = prev_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor(getattr(rows[-1], sort_key), getattr(rows[-1], id_key), 'next')
+    if rows and has_prev:
+        prev_cursor = encode_cursor(getattr(rows[0], sort_key), getattr(rows[0], id_key), 'prev')
+
+    return rows, {
+        "per_page": per_page,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+        "has_next": has_next,
+        "has_prev": has_prev
+    }
+
+
+def paginate_offset(query, order, page, per_page, count_fn=None):
+    """
+    Paginasi page/offset.
+
+    Args:
+        query: Query yang sudah difilter
+        order (list): Ekspresi ORDER BY
+        page (int): Nomor halaman, mulai dari 1
+        per_page (int): Jumlah baris per halaman
+        count_fn (callable, optional): Fungsi yang mengembalikan (total, is_estimate).
+            Jika None, total tidak dihitung dan hanya `has_next` yang dilaporkan
+            dengan mengambil satu baris ekstra.
+
+    Returns:
+        tuple: (rows, pagination)
+    """
+    query = query.order_by(*order).offset((page - 1) * per_page)
+
+    if count_fn is None:
+        rows = query.limit(per_page + 1).all()
+        return rows[:per_page], {
+            "page": page,
+            "per_page": per_page,
+            "has_next": len(rows) > per_page,
+            "has_prev": page > 1
+        }
+
+    total, is_estimate = count_fn()
+    rows = query.limit(per_page).all()
+    pagination = {
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "total_pages": (total + per_page - 1) // per_page
+    }
+    if is_estimate:
+        pagination["total_is_estimate"] = True
+    return rows, pagination
@@ -0,0 +1,129 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from flask import g, request, has_request_context
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.database.config import SLOW_QUERY_MS, N_PLUS_ONE_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+# Parameter bind (psycopg2 %(name)s / %s, sqlite ?), angka, dan string literal
+_PARAM_PATTERN = re.compile(r"%\(\w+\)s|%s|\?|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+# Daftar parameter IN (?, ?, ?) yang panjangnya berubah-ubah
+_PARAM_LIST_PATTERN = re.compile(r"\(\?(?:\s*,\s*\?)+\)")
+
+
+def normalize_sql(statement):
+    """
+    Bentuk statement tanpa nilai parameter, sehingga query yang sama dengan
+    parameter berbeda dihitung sebagai satu bentuk.
+    """
+    statement = _PARAM_PATTERN.sub('?', ' '.join(statement.split()))
+    return _PARAM_LIST_PATTERN.sub('(?)', statement)
+
+
+class RequestStats:
+    """
+    Statistik satu request: jumlah dan total waktu query, waktu per fase
+    (auth, serialize), dan jumlah eksekusi per bentuk statement.
+    """
+
+    def __init__(self):
+        self.query_count = 0
+        self.db_time = 0.0
+        self.phases = {}
+        self.statements = Counter()
+
+    def record_query(self, statement, elapsed):
+        self.query_count += 1
+        self.db_time += elapsed
+        self.statements[statement] += 1
+
+    def record_phase(self, name, elapsed):
+        self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    def server_timing(self):
+        entries = [f'db;dur={self.db_time * 1000:.1f};desc="{self.query_count} queries"']
+        for name, elapsed in self.phases.items():
+            entries.append(f'{name};dur={elapsed * 1000:.1f}')
+        return ', '.join(entries)
+
+
+def current_stats():
+    if not has_request_context():
+        return None
+    if 'request_stats' not in g:
+        g.request_stats = RequestStats()
+    return g.request_stats
+
+
+@contextmanager
+def timed(name):
+    """
+    Catat lama blok ini sebagai fase `name` pada header Server-Timing.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = current_stats()
+        if stats is not None:
+            stats.record_phase(name, time.perf_counter() - start)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    # Waktu encode JSON respons dicatat sebagai fase serialize
+    def dumps(self, obj, **kwargs):
+        with timed('serialize'):
+            return super().dumps(obj, **kwargs)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_start_time
+
+    stats = current_stats()
+    if stats is None:
+        return
+
+    normalized = normalize_sql(statement)
+    stats.record_query(normalized, elapsed)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1f ms) in %s %s: %s",
+            elapsed * 1000, request.method, request.path, normalized
+        )
+
+
+def init_app(app):
+    """
+    Pasang hook SQL di semua engine (primary dan replica) serta header
+    Server-Timing di setiap respons.
+    """
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    app.json = TimedJSONProvider(app)
+
+    @app.after_request
+    def add_server_timing(response):
+        stats = g.get('request_stats')
+        if stats is None:
+            return response
+
+        response.headers['Server-Timing'] = stats.server_timing()
+        for statement, count in stats.statements.items():
+            if count > N_PLUS_ONE_THRESHOLD:
+                logger.warning(
+                    "Possible N+1: statement executed %d times in %s %s: %s",
+                    count, request.method, request.path, statement
+                )
+        return response
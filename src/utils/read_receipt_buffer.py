@@ -0,0 +1,147 @@
+import atexit
+import logging
+import threading
+from sqlalchemy import text
+from src.database.config import engine, READ_RECEIPT_FLUSH_MS, READ_RECEIPT_FLUSH_MAX
+from src.database.models import SuratMasuk, SuratKeluar
+
+logger = logging.getLogger(__name__)
+
+SURAT_TABLES = {
+    'surat_masuk': SuratMasuk.__tablename__,
+    'surat_keluar': SuratKeluar.__tablename__,
+}
+
+
+def write_receipts(connection, surat_type, receipts):
+    """
+    Tambahkan receipt ke dibaca_oleh_id banyak surat dalam satu UPDATE.
+    User yang sudah tercatat dilewati; urutan baca tetap dipertahankan.
+
+    Args:
+        connection: Connection atau Session
+        surat_type (str): 'surat_masuk' / 'surat_keluar'
+        receipts (list): Pasangan (surat_id, user_id) sesuai urutan baca
+    """
+    if not receipts:
+        return
+    table = SURAT_TABLES[surat_type]
+    surat_ids, user_ids = zip(*receipts)
+    connection.execute(
+        text(f"""
+            UPDATE {table} AS s
+            SET dibaca_oleh_id = coalesce(s.dibaca_oleh_id, '{{}}') || r.user_ids
+            FROM (
+                SELECT p.surat_id, array_agg(p.user_id ORDER BY p.seq) AS user_ids
+                FROM unnest(CAST(:surat_ids AS integer[]), CAST(:user_ids AS integer[]))
+                    WITH ORDINALITY AS p(surat_id, user_id, seq)
+                JOIN {table} AS existing ON existing.id = p.surat_id
+                WHERE NOT coalesce(p.user_id = ANY(existing.dibaca_oleh_id), false)
+                GROUP BY p.surat_id
+            ) AS r
+            WHERE s.id = r.surat_id
+        """),
+        {"surat_ids": list(surat_ids), "user_ids": list(user_ids)}
+    )
+
+
+class ReadReceiptBuffer:
+    """
+    Buffer write-behind untuk read receipt. Banyak user yang membuka surat yang
+    sama dalam waktu berdekatan tidak lagi meng-UPDATE baris surat itu satu per
+    satu; receipt dikumpulkan di proses ini lalu ditulis sekaligus setiap
+    `flush_ms` milidetik atau saat mencapai `max_items`.
+
+    Receipt yang belum ditulis terlihat lewat `pending()`, dan sisa buffer
+    ditulis saat proses berhenti normal (atexit). Receipt hilang hanya jika
+    proses mati mendadak sebelum flush berikutnya.
+    """
+
+    def __init__(self, engine, flush_ms, max_items):
+        self.engine = engine
+        self.flush_interval = flush_ms / 1000
+        self.max_items = max_items
+        # {surat_type: {surat_id: [user_id, ...]}}; `_in_flight` sedang ditulis
+        self._pending = {}
+        self._in_flight = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._started = False
+
+    def _ensure_started(self):
+        # Thread flush baru dijalankan saat receipt pertama masuk, bukan saat import
+        if not self._started:
+            self._started = True
+            thread = threading.Thread(target=self._flush_forever, name='read-receipt-flusher', daemon=True)
+            thread.start()
+            atexit.register(self.flush)
+
+    def add(self, surat_type, surat_id, user_id):
+        with self._lock:
+            self._ensure_started()
+            readers = self._pending.setdefault(surat_type, {}).setdefault(surat_id, [])
+            if user_id in readers:
+                return
+            readers.append(user_id)
+            self._size += 1
+            if self._size >= self.max_items:
+                self._wakeup.set()
+
+    def pending(self, surat_type, surat_id):
+        """
+        User yang receipt-nya untuk surat ini belum tertulis ke database.
+        """
+        with self._lock:
+            readers = []
+            for buffer in (self._in_flight, self._pending):
+                for user_id in buffer.get(surat_type, {}).get(surat_id, ()):
+                    if user_id not in readers:
+                        readers.append(user_id)
+            return readers
+
+    def _flush_forever(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """
+        Tulis semua receipt tertunda dalam satu transaksi. Jika gagal, receipt
+        dikembalikan ke buffer untuk dicoba lagi pada flush berikutnya.
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending, self._size = self._pending, {}, 0
+                self._in_flight = batch
+            if not batch:
+                return
+
+            try:
+                with self.engine.begin() as conn:
+                    for surat_type, surats in batch.items():
+                        receipts = [
+                            (surat_id, user_id)
+                            for surat_id, user_ids in surats.items()
+                            for user_id in user_ids
+                        ]
+                        write_receipts(conn, surat_type, receipts)
+            except Exception:
+                logger.exception("Failed to flush read receipts, will retry")
+                with self._lock:
+                    for surat_type, surats in batch.items():
+                        for surat_id, user_ids in surats.items():
+                            readers = self._pending.setdefault(surat_type, {}).setdefault(surat_id, [])
+                            for user_id in reversed(user_ids):
+                                if user_id not in readers:
+                                    readers.insert(0, user_id)
+                                    self._size += 1
+            finally:
+                with self._lock:
+                    self._in_flight = {}
+
+
+# Create a singleton instance
+read_receipt_buffer = ReadReceiptBuffer(engine, READ_RECEIPT_FLUSH_MS, READ_RECEIPT_FLUSH_MAX)
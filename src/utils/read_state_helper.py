@@ -0,0 +1,55 @@
+from datetime import datetime
+from sqlalchemy import select, exists, and_, or_, func
+from src.database.models import ReadWatermark, ReadException
+
+# Dipakai jika user belum punya watermark: belum ada surat yang dianggap dibaca
+NO_WATERMARK = datetime.min
+
+
+def watermark_of(surat_type, user_id):
+    """
+    Watermark user sebagai ekspresi SQL. `user_id` boleh berupa nilai atau kolom
+    (mis. User.id) untuk query yang berkorelasi per user.
+    """
+    return func.coalesce(
+        select(ReadWatermark.read_through)
+        .where(ReadWatermark.user_id == user_id, ReadWatermark.surat_type == surat_type)
+        .scalar_subquery(),
+        NO_WATERMARK
+    )
+
+
+def has_read_exception(surat_type, user_id, surat_id):
+    return exists().where(
+        ReadException.user_id == user_id,
+        ReadException.surat_type == surat_type,
+        ReadException.surat_id == surat_id
+    )
+
+
+def is_read(surat_type, user_id, surat_id, inserted_at):
+    """
+    Ekspresi boolean "surat sudah dibaca user": di bawah watermark, atau ada di
+    daftar pengecualian.
+    """
+    return or_(
+        inserted_at <= watermark_of(surat_type, user_id),
+        has_read_exception(surat_type, user_id, surat_id)
+    )
+
+
+def unread_condition(model, surat_type, user_id):
+    """
+    Kondisi surat belum dibaca user. Bagian watermark berupa batas bawah
+    inserted_at, sehingga query memakai index (divisi, inserted_at) dan hanya
+    membaca surat di atas watermark.
+    """
+    return and_(
+        model.inserted_at > watermark_of(surat_type, user_id),
+        ~has_read_exception(surat_type, user_id, model.id)
+    )
+
+
+def read_count(model):
+    # Jumlah user yang sudah membuka surat, dihitung di database tanpa mengirim array-nya
+    return func.coalesce(func.cardinality(model.dibaca_oleh_id), 0)
@@ -0,0 +1,232 @@
+import re
+import threading
+from sqlalchemy import event, func, cast, case, literal, or_, inspect
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.dialects.postgresql import REGCONFIG
+from src.database.config import engine, SEARCH_TEXT_CONFIG
+from src.database.models import SuratMasuk, SuratKeluar
+
+# Kolom yang diindeks beserta bobotnya (A paling relevan, D paling rendah)
+SEARCH_FIELDS = (
+    ('nomor_surat', 'A'),
+    ('perihal', 'B'),
+    ('ditujukan_kepada', 'C'),
+    ('keterangan', 'D'),
+)
+
+# Bobot default ts_rank Postgres, dipakai juga oleh fallback agar urutannya sama
+WEIGHT_SCORES = {'A': 1.0, 'B': 0.4, 'C': 0.2, 'D': 0.1}
+
+_TOKEN_PATTERN = re.compile(r'[^\W_]+', re.UNICODE)
+
+
+def tokenize(text):
+    """
+    Pecah teks menjadi token huruf/angka kecil. Tokenisasi yang sama dipakai
+    untuk dokumen dan query, sehingga nomor surat seperti '001/KPU/2025'
+    tetap bisa dicari per bagian.
+    """
+    if not text:
+        return []
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+def use_fulltext():
+    return engine.dialect.name == 'postgresql'
+
+
+def build_search_vector(values):
+    """
+    Buat ekspresi tsvector berbobot dari nilai-nilai kolom surat.
+
+    Args:
+        values (dict): Nilai kolom sesuai SEARCH_FIELDS
+    """
+    config = cast(literal(SEARCH_TEXT_CONFIG), REGCONFIG)
+    vector = None
+    for field, weight in SEARCH_FIELDS:
+        part = func.setweight(
+            func.to_tsvector(config, ' '.join(tokenize(values.get(field)))),
+            weight
+        )
+        vector = part if vector is None else vector.op('||')(part)
+    return vector
+
+
+class InvertedIndex:
+    """
+    Indeks terbalik di memori sebagai pengganti tsvector untuk database selain
+    Postgres (mis. SQLite saat pengujian). Dimuat dari database saat pertama
+    kali dipakai, lalu diperbarui setelah commit setiap kali surat dibuat,
+    diubah, atau dihapus.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._postings = {}
+        self._documents = {}
+        self._loaded = False
+        self._lock = threading.RLock()
+
+    def add(self, surat_id, values):
+        with self._lock:
+            self._discard(surat_id)
+            weights = {}
+            for field, weight in SEARCH_FIELDS:
+                for token in tokenize(values.get(field)):
+                    weights[token] = max(weights.get(token, 0), WEIGHT_SCORES[weight])
+            for token, score in weights.items():
+                self._postings.setdefault(token, {})[surat_id] = score
+            self._documents[surat_id] = list(weights)
+
+    def remove(self, surat_id):
+        with self._lock:
+            self._discard(surat_id)
+
+    def search(self, db, tokens):
+        """
+        Cari surat yang memuat semua token (prefix match).
+
+        Returns:
+            dict: {surat_id: skor relevansi}
+        """
+        with self._lock:
+            self._ensure_loaded(db)
+            scores = None
+            for query_token in tokens:
+                matches = {}
+                for token, postings in self._postings.items():
+                    if token.startswith(query_token):
+                        for surat_id, score in postings.items():
+                            matches[surat_id] = max(matches.get(surat_id, 0), score)
+
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {
+                        surat_id: scores[surat_id] + score
+                        for surat_id, score in matches.items() if surat_id in scores
+                    }
+                if not scores:
+                    return {}
+            return scores or {}
+
+    def _discard(self, surat_id):
+        for token in self._documents.pop(surat_id, []):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(surat_id, None)
+                if not postings:
+                    del self._postings[token]
+
+    def _ensure_loaded(self, db):
+        if self._loaded:
+            return
+        columns = [getattr(self.model, field) for field, _ in SEARCH_FIELDS]
+        for row in db.query(self.model.id, *columns).all():
+            self.add(row.id, row._asdict())
+        self._loaded = True
+
+
+fallback_indexes = {
+    SuratMasuk: InvertedIndex(SuratMasuk),
+    SuratKeluar: InvertedIndex(SuratKeluar),
+}
+
+
+def _nomor_surat_match(model, term):
+    # Potongan nomor surat (mis. 'PU/20') dicari sebagai substring, seperti ILIKE sebelumnya
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return model.nomor_surat.ilike(f"%{escaped}%", escape='\\')
+
+
+def build_search_filter(db, model, term):
+    """
+    Buat kondisi WHERE dan ekspresi skor relevansi untuk pencarian teks surat:
+    prefix token di kolom SEARCH_FIELDS, atau substring di nomor_surat.
+
+    Returns:
+        tuple: (condition, rank). Keduanya None jika term kosong; rank None
+        jika tidak ada token yang cocok (hanya pencocokan nomor_surat)
+    """
+    term = term.strip() if term else ''
+    if not term:
+        return None, None
+
+    nomor_match = _nomor_surat_match(model, term)
+    tokens = tokenize(term)
+    if not tokens:
+        return nomor_match, None
+
+    if use_fulltext():
+        ts_query = func.to_tsquery(
+            cast(literal(SEARCH_TEXT_CONFIG), REGCONFIG),
+            ' & '.join(f"{token}:*" for token in tokens)
+        )
+        return (
+            or_(model.search_vector.op('@@')(ts_query), nomor_match),
+            func.ts_rank(model.search_vector, ts_query)
+        )
+
+    scores = fallback_indexes[model].search(db, tokens)
+    if not scores:
+        return nomor_match, None
+    return or_(model.id.in_(list(scores)), nomor_match), case(scores, value=model.id, else_=0)
+
+
+def _search_values(target):
+    return {field: getattr(target, field) for field, _ in SEARCH_FIELDS}
+
+
+def _search_fields_changed(target):
+    state = inspect(target)
+    return any(state.attrs[field].history.has_changes() for field, _ in SEARCH_FIELDS)
+
+
+def _before_insert(mapper, connection, target):
+    if use_fulltext():
+        target.search_vector = build_search_vector(_search_values(target))
+
+
+def _before_update(mapper, connection, target):
+    if use_fulltext() and _search_fields_changed(target):
+        target.search_vector = build_search_vector(_search_values(target))
+
+
+def _stage_index_change(target, model, values):
+    # Event mapper berjalan saat flush; indeks fallback baru diubah setelah commit
+    session = object_session(target)
+    session.info.setdefault('search_index_changes', []).append((model, target.id, values))
+
+
+def _after_write(mapper, connection, target):
+    if not use_fulltext():
+        _stage_index_change(target, mapper.class_, _search_values(target))
+
+
+def _after_delete(mapper, connection, target):
+    if not use_fulltext():
+        _stage_index_change(target, mapper.class_, None)
+
+
+def _after_commit(session):
+    for model, surat_id, values in session.info.pop('search_index_changes', []):
+        if values is None:
+            fallback_indexes[model].remove(surat_id)
+        else:
+            fallback_indexes[model].add(surat_id, values)
+
+
+def _after_rollback(session):
+    session.info.pop('search_index_changes', None)
+
+
+# search_vector dijaga otomatis di setiap insert/update, dari service mana pun
+for _model in (SuratMasuk, SuratKeluar):
+    event.listen(_model, 'before_insert', _before_insert)
+    event.listen(_model, 'before_update', _before_update)
+    event.listen(_model, 'after_insert', _after_write)
+    event.listen(_model, 'after_update', _after_write)
+    event.listen(_model, 'after_delete', _after_delete)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_rollback', _after_rollback)
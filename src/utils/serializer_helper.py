@@ -0,0 +1,27 @@
+from src.utils.query_stats_helper import timed
+
+# Kolom tanggal ditampilkan sebagai 'YYYY-MM-DD', timestamp sebagai 'YYYY-MM-DD HH:MM:SS'
+DATE_FIELDS = ('tanggal_surat', 'tanggal_terima', 'tanggal_kirim')
+DATETIME_FIELDS = ('inserted_at',)
+
+
+def serialize_surat_row(row):
+    """
+    Ubah satu baris hasil query kolom (Row) surat masuk/keluar menjadi dict respons.
+    Hanya kolom yang ada di baris yang ikut diserialisasi.
+    """
+    data = row._asdict()
+    for field in DATE_FIELDS:
+        value = data.get(field)
+        if value is not None:
+            data[field] = value.date().isoformat()
+    for field in DATETIME_FIELDS:
+        value = data.get(field)
+        if value is not None:
+            data[field] = value.isoformat(sep=' ', timespec='seconds')
+    return data
+
+
+def serialize_surat_rows(rows):
+    with timed('serialize'):
+        return [serialize_surat_row(row) for row in rows]
@@ -0,0 +1,86 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from src.database.config import FILE_URL_SECRET, FILE_URL_TTL, JWT_SECRET_KEY
+
+# Token URL download file: <payload>.<signature>, keduanya base64url.
+# Payload hanya berisi tipe surat, id, hash isi, dan waktu kedaluwarsa (tanpa
+# path di server). File yang disimpan per hash langsung diketahui lokasinya dari
+# hash, sehingga route download cukup memverifikasi HMAC di memori tanpa JWT
+# maupun query database.
+
+
+def _derive_secret():
+    """
+    Kunci penanda tangan URL. Tanpa FILE_URL_SECRET, kunci diturunkan dari
+    JWT_SECRET_KEY dengan HKDF-SHA256 (label khusus), sehingga token URL dan JWT
+    tidak pernah memakai kunci yang sama.
+    """
+    if FILE_URL_SECRET:
+        return FILE_URL_SECRET.encode('utf-8')
+    prk = hmac.new(b'\x00' * hashlib.sha256().digest_size, JWT_SECRET_KEY.encode('utf-8'), hashlib.sha256).digest()
+    return hmac.new(prk, b'kpu-backend signed file url\x01', hashlib.sha256).digest()
+
+
+SIGNING_KEY = _derive_secret()
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _signature(payload):
+    return hmac.new(SIGNING_KEY, payload.encode('ascii'), hashlib.sha256).digest()
+
+
+def sign_file_token(surat_type, surat_id, file_hash=None, ttl=None):
+    """
+    Buat token download untuk file satu surat.
+
+    Waktu kedaluwarsa dibulatkan ke atas ke kelipatan ttl, sehingga file yang
+    sama menghasilkan URL yang sama selama satu jendela waktu dan response-nya
+    bisa dipakai ulang dari cache reverse proxy. Token berlaku antara ttl dan
+    2 * ttl detik.
+
+    Returns:
+        tuple: (token, expires) dengan expires berupa unix timestamp
+    """
+    ttl = ttl or FILE_URL_TTL
+    expires = (int(time.time()) // ttl + 2) * ttl
+    payload = _b64encode(json.dumps(
+        {"t": surat_type, "i": surat_id, "h": file_hash, "e": expires},
+        separators=(',', ':')
+    ).encode('utf-8'))
+    return f"{payload}.{_b64encode(_signature(payload))}", expires
+
+
+def verify_file_token(token):
+    """
+    Periksa tanda tangan dan masa berlaku token.
+
+    Returns:
+        dict: {"surat_type", "surat_id", "file_hash", "expires"}, atau None
+        jika token tidak valid atau sudah kedaluwarsa
+    """
+    payload, _, signature = token.partition('.')
+    try:
+        if not hmac.compare_digest(_b64decode(signature), _signature(payload)):
+            return None
+        data = json.loads(_b64decode(payload))
+    except (ValueError, UnicodeError):
+        return None
+
+    if data["e"] <= time.time():
+        return None
+    return {
+        "surat_type": data["t"],
+        "surat_id": data["i"],
+        "file_hash": data["h"],
+        "expires": data["e"]
+    }
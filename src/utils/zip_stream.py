@@ -0,0 +1,181 @@
+import struct
+import time
+import zlib
+
+# Batas field 32-bit/16-bit format ZIP; di atasnya dipakai ekstensi ZIP64
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_COUNT_LIMIT = 0xFFFF
+
+STORED = 0
+DEFLATED = 8
+
+# Bit 3: ukuran dan CRC ditulis di data descriptor setelah isi entry.
+# Bit 11: nama file UTF-8.
+FLAGS = 0x0808
+VERSION = 20
+VERSION_ZIP64 = 45
+# Dibuat di Unix (byte atas) dengan versi spesifikasi 4.5
+VERSION_MADE_BY = (3 << 8) | VERSION_ZIP64
+# Permission file biasa (rw-r--r--) di external attributes
+EXTERNAL_ATTR = 0o100644 << 16
+
+
+def _dos_datetime(timestamp):
+    t = time.localtime(timestamp)
+    year = max(t.tm_year, 1980)
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class _Entry:
+    def __init__(self, name, method, modified, zip64, offset):
+        self.name = name.encode('utf-8')
+        self.method = method
+        self.dos_time, self.dos_date = _dos_datetime(modified)
+        self.zip64 = zip64
+        self.offset = offset
+        self.crc = 0
+        self.compressed_size = 0
+        self.size = 0
+
+
+class ZipStream:
+    """
+    Penulis arsip ZIP yang menghasilkan byte secara bertahap, tanpa file
+    sementara dan tanpa perlu seek. Ukuran dan CRC setiap entry ditulis di
+    data descriptor setelah isinya, sehingga memori hanya sebesar satu chunk.
+    ZIP64 dipakai otomatis untuk entry/arsip di atas 4 GB atau 65535 entry.
+
+    Contoh:
+        archive = ZipStream()
+        for chunk in archive.add('a.txt', [b'halo']):
+            yield chunk
+        yield from archive.finish()
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._offset = 0
+
+    def _emit(self, data):
+        self._offset += len(data)
+        return data
+
+    def add(self, name, chunks, size=None, compress=True, modified=None):
+        """
+        Tambahkan satu entry.
+
+        Args:
+            name (str): Path di dalam arsip
+            chunks (iterable): Isi entry berupa potongan bytes
+            size (int, optional): Ukuran isi jika diketahui; entry di atas 4 GB
+                dengan size diketahui ditandai ZIP64 sejak local header
+            compress (bool): Deflate isi; matikan untuk file yang sudah
+                terkompresi (PDF, gambar) supaya tidak membuang CPU
+            modified (float, optional): Waktu modifikasi (epoch), default sekarang
+
+        Yields:
+            bytes: Bagian arsip untuk entry ini
+        """
+        # Ukuran yang belum diketahui diperlakukan seperti entry biasa; jika ternyata
+        # melewati 4 GB, data descriptor dan central directory memakai ZIP64
+        zip64 = size is not None and size >= ZIP64_LIMIT
+        entry = _Entry(
+            name, DEFLATED if compress else STORED,
+            modified if modified is not None else time.time(),
+            zip64, self._offset
+        )
+
+        yield self._emit(self._local_header(entry))
+
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15) if compress else None
+        for chunk in chunks:
+            if not chunk:
+                continue
+            entry.crc = zlib.crc32(chunk, entry.crc)
+            entry.size += len(chunk)
+            data = compressor.compress(chunk) if compressor else chunk
+            if data:
+                entry.compressed_size += len(data)
+                yield self._emit(data)
+        if compressor:
+            data = compressor.flush()
+            entry.compressed_size += len(data)
+            yield self._emit(data)
+
+        yield self._emit(self._data_descriptor(entry))
+        self._entries.append(entry)
+
+    def finish(self):
+        """
+        Tulis central directory dan penutup arsip.
+
+        Yields:
+            bytes: Bagian akhir arsip
+        """
+        directory_offset = self._offset
+        for entry in self._entries:
+            yield self._emit(self._directory_header(entry))
+        directory_size = self._offset - directory_offset
+
+        count = len(self._entries)
+        if count >= ZIP64_COUNT_LIMIT or directory_offset >= ZIP64_LIMIT or directory_size >= ZIP64_LIMIT:
+            zip64_end_offset = self._offset
+            yield self._emit(struct.pack(
+                '<IQHHIIQQQQ', 0x06064b50, 44, VERSION_MADE_BY, VERSION_ZIP64,
+                0, 0, count, count, directory_size, directory_offset
+            ))
+            yield self._emit(struct.pack('<IIQI', 0x07064b50, 0, zip64_end_offset, 1))
+
+        yield self._emit(struct.pack(
+            '<IHHHHIIH', 0x06054b50, 0, 0,
+            min(count, ZIP64_COUNT_LIMIT), min(count, ZIP64_COUNT_LIMIT),
+            min(directory_size, ZIP64_LIMIT), min(directory_offset, ZIP64_LIMIT), 0
+        ))
+
+    def _local_header(self, entry):
+        extra = b''
+        sizes = 0
+        if entry.zip64:
+            # Ukuran sebenarnya ada di data descriptor (8 byte)
+            extra = struct.pack('<HHQQ', 0x0001, 16, 0, 0)
+            sizes = ZIP64_LIMIT
+        return struct.pack(
+            '<IHHHHHIIIHH', 0x04034b50,
+            VERSION_ZIP64 if entry.zip64 else VERSION, FLAGS, entry.method,
+            entry.dos_time, entry.dos_date, 0, sizes, sizes,
+            len(entry.name), len(extra)
+        ) + entry.name + extra
+
+    def _data_descriptor(self, entry):
+        if entry.zip64 or max(entry.size, entry.compressed_size) >= ZIP64_LIMIT:
+            return struct.pack('<IIQQ', 0x08074b50, entry.crc, entry.compressed_size, entry.size)
+        return struct.pack('<IIII', 0x08074b50, entry.crc, entry.compressed_size, entry.size)
+
+    def _directory_header(self, entry):
+        # Field yang tidak muat 32 bit diisi 0xFFFFFFFF, nilainya di extra ZIP64
+        zip64_fields = []
+        size = entry.size
+        compressed_size = entry.compressed_size
+        offset = entry.offset
+        if size >= ZIP64_LIMIT:
+            zip64_fields.append(size)
+            size = ZIP64_LIMIT
+        if compressed_size >= ZIP64_LIMIT:
+            zip64_fields.append(compressed_size)
+            compressed_size = ZIP64_LIMIT
+        if offset >= ZIP64_LIMIT:
+            zip64_fields.append(offset)
+            offset = ZIP64_LIMIT
+
+        extra = b''
+        if zip64_fields:
+            extra = struct.pack(f'<HH{len(zip64_fields)}Q', 0x0001, 8 * len(zip64_fields), *zip64_fields)
+
+        return struct.pack(
+            '<IHHHHHHIIIHHHHHII', 0x02014b50, VERSION_MADE_BY,
+            VERSION_ZIP64 if entry.zip64 or zip64_fields else VERSION, FLAGS, entry.method,
+            entry.dos_time, entry.dos_date, entry.crc, compressed_size, size,
+            len(entry.name), len(extra), 0, 0, 0, EXTERNAL_ATTR, offset
+        ) + entry.name + extra